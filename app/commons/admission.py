@@ -0,0 +1,174 @@
+import asyncio
+import hashlib
+import math
+import time
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.commons.cache import TTLCache
+from app.commons.metrics import (
+    ADMISSION_QUEUE_SECONDS,
+    ADMISSION_REJECTIONS,
+    RATE_LIMITED_REQUESTS,
+)
+from app.commons.settings import Settings, get_settings
+
+
+settings = get_settings()
+
+# Path prefix -> route group sharing one concurrency limit
+ROUTE_GROUPS = {
+    "/courses": "courses",
+    "/streams": "streams",
+    "/users": "users",
+    "/auth": "users",
+}
+
+
+def route_group(path: str) -> Optional[str]:
+    for prefix, group in ROUTE_GROUPS.items():
+        if path == prefix or path.startswith(prefix + "/"):
+            return group
+    return None
+
+
+class ConcurrencyLimit:
+    """
+    At most ``limit`` requests run at a time. Up to ``queue_size`` more wait for a slot, each for at most
+    ``queue_timeout`` seconds; anything beyond is turned away at once instead of piling up on the database pool.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(limit)
+        self._queue_seconds = ADMISSION_QUEUE_SECONDS.labels(name)
+
+    async def acquire(self) -> Optional[str]:
+        """Takes a slot and returns None, or returns why the request is rejected ("queue_full" or "queue_timeout")."""
+        if not self._slots.locked():
+            await self._slots.acquire()
+            return None
+        if self.waiting >= self.queue_size:
+            return "queue_full"
+
+        self.waiting += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            return None
+        except TimeoutError:
+            return "queue_timeout"
+        finally:
+            self.waiting -= 1
+            self._queue_seconds.observe(time.perf_counter() - started)
+
+    def release(self) -> None:
+        self._slots.release()
+
+
+class MemoryTokenBuckets:
+    """
+    A token bucket per client in process memory: ``rate`` requests per second on average, ``burst`` at once.
+    With several workers each keeps its own buckets, so a client gets up to the rate once per worker.
+    """
+
+    def __init__(self, rate: float, burst: int, maxsize: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        # A bucket left alone long enough to refill is the same as no bucket
+        self.buckets: TTLCache[tuple[float, float]] = TTLCache(maxsize=maxsize, ttl=burst / rate)
+
+    def take(self, key: bytes) -> float:
+        """Takes a token from the bucket of ``key``: 0 when there was one, else the seconds until there is."""
+        now = time.monotonic()
+        tokens, updated = self.buckets.get(key) or (float(self.burst), now)
+        tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            return (1 - tokens) / self.rate
+        self.buckets.set(key, (tokens - 1, now))
+        return 0.0
+
+
+def client_key(scope: Scope) -> bytes:
+    """Users are told apart by their Authorization header, anonymous clients by address."""
+    authorization = Headers(scope=scope).get("authorization")
+    if authorization:
+        return hashlib.blake2b(authorization.encode(), digest_size=16).digest()
+    client = scope.get("client")
+    return f"address:{client[0] if client else ''}".encode()
+
+
+def concurrency_limits(settings: Settings) -> dict[str, ConcurrencyLimit]:
+    limits = {
+        "courses": settings.ADMISSION_COURSES_CONCURRENCY,
+        "streams": settings.ADMISSION_STREAMS_CONCURRENCY,
+        "users": settings.ADMISSION_USERS_CONCURRENCY,
+    }
+    return {
+        group: ConcurrencyLimit(group, limit, settings.ADMISSION_QUEUE_SIZE, settings.ADMISSION_QUEUE_TIMEOUT)
+        for group, limit in limits.items()
+        if limit > 0
+    }
+
+
+class AdmissionControlMiddleware:
+    """
+    Sheds load before it reaches the database: each route group (courses, streams, users and auth) runs a
+    bounded number of requests at a time and answers 503 with Retry-After when its wait queue is full or a
+    request waited past the deadline. With RATE_LIMIT_PER_SECOND set, clients over their token bucket get 429.
+    Other routes (/metrics, /docs, exports) are not limited.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.limits = concurrency_limits(settings)
+        self.buckets = (
+            MemoryTokenBuckets(settings.RATE_LIMIT_PER_SECOND, settings.RATE_LIMIT_BURST)
+            if settings.RATE_LIMIT_PER_SECOND
+            else None
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        group = route_group(scope["path"]) if scope["type"] == "http" else None
+        if group is None:
+            await self.app(scope, receive, send)
+            return
+
+        if self.buckets is not None:
+            wait = self.buckets.take(client_key(scope))
+            if wait:
+                RATE_LIMITED_REQUESTS.labels(group).inc()
+                response = reject(status_code=429, detail="Too many requests", retry_after=wait)
+                await response(scope, receive, send)
+                return
+
+        limit = self.limits.get(group)
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        reason = await limit.acquire()
+        if reason is not None:
+            ADMISSION_REJECTIONS.labels(group, reason).inc()
+            response = reject(
+                status_code=503, detail="Server is busy, retry later", retry_after=settings.ADMISSION_RETRY_AFTER
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limit.release()
+
+
+def reject(status_code: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        {"detail": detail}, status_code=status_code, headers={"Retry-After": str(math.ceil(retry_after))}
+    )
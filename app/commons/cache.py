@@ -0,0 +1,61 @@
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, TypeVar
+
+from app.commons.metrics import CACHE_REQUESTS
+
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """
+    Bounded in-process LRU cache whose entries expire ``ttl`` seconds after being set.
+    Caches given a ``name`` count their hits and misses in the ``cache_requests`` metric.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, name: Optional[str] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+        self._hit_metric = self._miss_metric = None
+        if name is not None:
+            self._hit_metric = CACHE_REQUESTS.labels(name, "hit")
+            self._miss_metric = CACHE_REQUESTS.labels(name, "miss")
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            if self._miss_metric is not None:
+                self._miss_metric.inc()
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        if self._hit_metric is not None:
+            self._hit_metric.inc()
+        return entry[1]
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
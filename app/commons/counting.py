@@ -0,0 +1,100 @@
+from functools import lru_cache
+from typing import Optional, Protocol
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from app.commons.cache import TTLCache
+from app.commons.settings import CountStrategyEnum, get_settings
+
+
+class TotalCounter(Protocol):
+    async def count(self, db: AsyncSession, model) -> int: ...
+
+    def invalidate(self, model) -> None: ...
+
+
+class ExactCounter:
+    async def count(self, db: AsyncSession, model) -> int:
+        return (await db.scalars(select(func.count()).select_from(model))).one()
+
+    def invalidate(self, model) -> None:
+        pass
+
+
+class CachedCounter:
+    """Exact count remembered per table for ``ttl`` seconds; writes in this process drop it right away."""
+
+    def __init__(self, ttl: float, counter: Optional[TotalCounter] = None):
+        self.counter = counter or ExactCounter()
+        self.cache: TTLCache[int] = TTLCache(ttl=ttl, name="pagination_totals")
+
+    async def count(self, db: AsyncSession, model) -> int:
+        key = model.__tablename__
+        total = self.cache.get(key)
+        if total is None:
+            total = await self.counter.count(db, model)
+            self.cache.set(key, total)
+        return total
+
+    def invalidate(self, model) -> None:
+        self.cache.invalidate(model.__tablename__)
+
+
+class EstimatedCounter:
+    """
+    Planner estimate from ``pg_class.reltuples``. Tables below ``threshold`` rows (or never analyzed)
+    and non-PostgreSQL databases fall back to ``counter``.
+    """
+
+    def __init__(self, threshold: int, counter: Optional[TotalCounter] = None):
+        self.threshold = threshold
+        self.counter = counter or ExactCounter()
+
+    async def count(self, db: AsyncSession, model) -> int:
+        if db.bind.dialect.name == "postgresql":
+            estimate = (
+                await db.scalars(
+                    text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)"),
+                    {"name": model.__tablename__},
+                )
+            ).first()
+            if estimate is not None and estimate >= self.threshold:
+                return estimate
+        return await self.counter.count(db, model)
+
+    def invalidate(self, model) -> None:
+        self.counter.invalidate(model)
+
+
+@lru_cache
+def get_total_counter() -> TotalCounter:
+    settings = get_settings()
+    match settings.PAGINATION_COUNT_STRATEGY:
+        case CountStrategyEnum.exact:
+            return ExactCounter()
+        case CountStrategyEnum.estimated:
+            return EstimatedCounter(
+                settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD,
+                CachedCounter(settings.PAGINATION_COUNT_TTL),
+            )
+        case _:
+            return CachedCounter(settings.PAGINATION_COUNT_TTL)
+
+
+async def count_total(db: AsyncSession, model, with_total: bool = True) -> Optional[int]:
+    if not with_total:
+        return None
+    return await get_total_counter().count(db, model)
+
+
+async def count_matching(db: AsyncSession, model, conditions: list, with_total: bool = True) -> Optional[int]:
+    """Exact count of filtered rows: filters narrow the scan through an index, so it is neither cached nor estimated."""
+    if not with_total:
+        return None
+    return (await db.scalars(select(func.count()).select_from(model).where(*conditions))).one()
+
+
+def invalidate_total(model) -> None:
+    get_total_counter().invalidate(model)
@@ -1,32 +1,227 @@
+import json
+import time
+from functools import lru_cache
+from pathlib import Path
 from typing import AsyncGenerator
 
-from sqlalchemy.engine.url import make_url
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.orm import DeclarativeBase
+from fastapi import Request
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine.url import URL, make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
+from app.commons import sql  # noqa: F401  registers the SQLite compilation shims
+from app.commons.instrumentation import instrument_queries
+from app.commons.metrics import (
+    DB_POOL_ACQUIRE_SECONDS,
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_CONNECTIONS,
+    DB_POOL_MAX_CONNECTIONS,
+    DB_POOL_TIMEOUTS,
+    DB_POOL_WAITERS,
+    DB_READ_SESSIONS,
+)
+from app.commons.prebuild import SCHEMA_HEADS_FILE
+from app.commons.replicas import RecentWriters, Replica, ReplicaSet
 from app.commons.settings import get_settings
 
 
 settings = get_settings()
 
 
-database_url = make_url(settings.DATABASE_URL)
-database_url = database_url.set(drivername=f"{database_url.drivername}+asyncpg")
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def async_database_url(url: str) -> URL:
+    url = make_url(url)
+    backend = url.get_backend_name()
+    url = url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    if backend == "postgresql":
+        # SQLAlchemy keeps its own prepared statement cache on top of asyncpg's, size both together
+        url = url.update_query_dict({"prepared_statement_cache_size": str(settings.DB_STATEMENT_CACHE_SIZE)})
+    return url
+
+
+database_url = async_database_url(settings.DATABASE_URL)
+backend = database_url.get_backend_name()
+replica_urls = [async_database_url(url.strip()) for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
 
 
 class Base(DeclarativeBase):
     pass
 
 
-engine = create_async_engine(database_url)
-async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that reports how many callers wait for a connection and for how long."""
+
+    def connect(self):
+        DB_POOL_WAITERS.inc()
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            DB_POOL_WAITERS.dec()
+            DB_POOL_ACQUIRE_SECONDS.observe(time.perf_counter() - started)
+
+
+def engine_options() -> dict:
+    if backend == "sqlite":
+        # Dev and test setup: aiosqlite with SQLAlchemy's default pool
+        return {}
+    return {
+        "poolclass": InstrumentedPool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "connect_args": {
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "command_timeout": settings.DB_COMMAND_TIMEOUT,
+        },
+    }
+
+
+def instrument_pool(sync_engine) -> None:
+    event.listen(sync_engine, "checkout", lambda *args: DB_POOL_CHECKED_OUT.inc())
+    event.listen(sync_engine, "checkin", lambda *args: DB_POOL_CHECKED_OUT.dec())
+    event.listen(sync_engine, "connect", lambda *args: DB_POOL_CONNECTIONS.inc())
+    event.listen(sync_engine, "close", lambda *args: DB_POOL_CONNECTIONS.dec())
+    event.listen(sync_engine, "close_detached", lambda *args: DB_POOL_CONNECTIONS.dec())
+    if backend != "sqlite":
+        DB_POOL_MAX_CONNECTIONS.inc(settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW)
+
+
+@lru_cache
+def get_engine() -> AsyncEngine:
+    """
+    Engine built on first use, so importing the app (CLI tools, OpenAPI build, forked workers) opens nothing
+    and every worker process gets a pool of its own.
+    """
+    engine = create_async_engine(database_url, **engine_options())
+    instrument_pool(engine.sync_engine)
+    instrument_queries(engine.sync_engine)
+    return engine
+
+
+@lru_cache
+def get_session_maker() -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(get_engine(), expire_on_commit=False)
+
+
+@lru_cache
+def get_replica_set() -> ReplicaSet:
+    replicas = []
+    for url in replica_urls:
+        options = engine_options()
+        if url.get_backend_name() == "postgresql":
+            # Give up on an unreachable replica quickly, the read then goes to the primary
+            options["connect_args"]["timeout"] = settings.DB_REPLICA_CONNECT_TIMEOUT
+        engine = create_async_engine(url, **options)
+        instrument_pool(engine.sync_engine)
+        instrument_queries(engine.sync_engine)
+        replicas.append(Replica(engine, settings.DB_REPLICA_COOLDOWN))
+    return ReplicaSet(replicas, settings.DB_REPLICA_SELECTION)
+
+
+recent_writers = RecentWriters(settings.DB_READ_YOUR_WRITES_WINDOW)
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_commit(session: Session):
+    session.info["committed"] = True
+
+
+ALEMBIC_CONFIG = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+
+def migration_heads() -> set[str]:
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    return set(ScriptDirectory.from_config(Config(ALEMBIC_CONFIG)).get_heads())
+
+
+def expected_schema_heads() -> set[str]:
+    """Migration heads of this build, as written by ``prebuild``; loading Alembic for them takes a few hundred ms."""
+    precomputed = settings.BUILD_DIR / SCHEMA_HEADS_FILE
+    if precomputed.exists():
+        return set(json.loads(precomputed.read_bytes()))
+    return migration_heads()
+
+
+async def verify_schema_revision():
+    """Refuses to start against a database that is not migrated to the revision this build ships with."""
+    if not settings.DB_VERIFY_SCHEMA:
+        return
+    expected = expected_schema_heads()
+    async with get_engine().connect() as conn:
+        current = set()
+        if await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table("alembic_version")):
+            current = set((await conn.scalars(text("SELECT version_num FROM alembic_version"))).all())
+    if current != expected:
+        raise RuntimeError(
+            f"Database schema is at revision {', '.join(sorted(current)) or 'none'}, "
+            f"expected {', '.join(sorted(expected))}: run `make migrate`"
+        )
+
+
+async def dispose_engines():
+    """Closes this worker's pooled connections on shutdown, so the database sees clean disconnects."""
+    await get_engine().dispose()
+    for replica in get_replica_set().replicas:
+        await replica.engine.dispose()
 
 
 async def create_db_and_tables():
-    async with engine.begin() as conn:
+    async with get_engine().begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
 
-async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
-    async with async_session_maker() as session:
+async def get_async_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    async with get_session_maker()() as session:
+        yield session
+        if session.info.get("committed"):
+            recent_writers.remember(request)
+
+
+async def open_read_session(request: Request) -> AsyncSession:
+    if recent_writers.wrote_recently(request):
+        DB_READ_SESSIONS.labels("primary").inc()
+        return get_session_maker()()
+    replica = get_replica_set().choose()
+    if replica is None:
+        DB_READ_SESSIONS.labels("primary").inc()
+        return get_session_maker()()
+
+    session = replica.session_maker()
+    try:
+        # Connect now, so a replica that is down costs a fallback instead of a failed request
+        await session.connection()
+    except (DBAPIError, OSError, PoolTimeoutError):
+        await session.close()
+        replica.mark_unhealthy()
+        DB_READ_SESSIONS.labels("fallback").inc()
+        return get_session_maker()()
+    DB_READ_SESSIONS.labels("replica").inc()
+    return session
+
+
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session for endpoints that only read: on a replica from DATABASE_REPLICA_URLS, or on the primary when
+    none is configured or healthy, or when the same client wrote within DB_READ_YOUR_WRITES_WINDOW.
+    """
+    async with await open_read_session(request) as session:
         yield session
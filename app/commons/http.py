@@ -0,0 +1,32 @@
+from functools import lru_cache
+
+import httpx
+
+from app.commons.settings import get_settings
+
+
+settings = get_settings()
+
+
+@lru_cache
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Client for outgoing HTTP calls (OAuth providers), one per worker process. Connections to a host stay open
+    between requests, so only the first call pays for DNS, TCP and the TLS handshake. HTTP/2 is negotiated
+    where the host offers it (``HTTP_CLIENT_HTTP2``).
+    """
+    return httpx.AsyncClient(
+        http2=settings.HTTP_CLIENT_HTTP2,
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE,
+            keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(settings.HTTP_CLIENT_TIMEOUT, connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT),
+    )
+
+
+async def close_http_client():
+    if get_http_client.cache_info().currsize:
+        await get_http_client().aclose()
+        get_http_client.cache_clear()
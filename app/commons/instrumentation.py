@@ -0,0 +1,148 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.commons.settings import get_settings
+
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+    serialize_seconds: float = 0.0
+    query_budget: Optional[int] = None
+    fingerprints: Counter = field(default_factory=Counter)
+
+    def repeated(self) -> list[tuple[str, int]]:
+        return [(statement, count) for statement, count in self.fingerprints.most_common() if count > 1]
+
+
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDER = re.compile(r"\$\d+|%\(\w+\)s|%s")
+_PLACEHOLDER_LIST = re.compile(r"\(\?(?:, \?)+\)")
+
+
+def fingerprint(statement: str) -> str:
+    """Statement text with placeholders unified and IN lists collapsed, so repeats with other values group together."""
+    statement = _PLACEHOLDER.sub("?", _WHITESPACE.sub(" ", statement).strip())
+    return _PLACEHOLDER_LIST.sub("(?, ...)", statement)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if request_stats.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = request_stats.get()
+    if stats is None or not conn.info.get("query_started"):
+        return
+    stats.db_seconds += time.perf_counter() - conn.info["query_started"].pop()
+    stats.queries += 1
+    stats.fingerprints[fingerprint(statement)] += 1
+
+
+def instrument_queries(sync_engine) -> None:
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def record_serialization(seconds: float) -> None:
+    stats = request_stats.get()
+    if stats is not None:
+        stats.serialize_seconds += seconds
+
+
+def query_budget(max_queries: int):
+    """
+    Route dependency declaring how many statements the endpoint may run, e.g.
+    ``dependencies=[Depends(query_budget(3))]``. Overrides ``SQL_QUERY_BUDGET`` for that route.
+    """
+
+    def declare_query_budget():
+        stats = request_stats.get()
+        if stats is not None:
+            stats.query_budget = max_queries
+
+    return declare_query_budget
+
+
+def server_timing(stats: RequestStats, total: float) -> str:
+    return ", ".join(
+        [
+            f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"',
+            f"serialize;dur={stats.serialize_seconds * 1000:.1f}",
+            f"total;dur={total * 1000:.1f}",
+        ]
+    )
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Counts and times the SQL statements of every request. Adds a ``Server-Timing`` header and logs requests
+    that run more statements than their query budget or spend longer than ``SQL_DURATION_BUDGET_MS`` in the
+    database, along with the statements they repeated. With ``SQL_BUDGET_STRICT`` (test runs) going over
+    the query budget raises ``QueryBudgetExceeded`` instead of responding.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                self.check_budget(scope, stats)
+                if settings.SERVER_TIMING_HEADER:
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing", server_timing(stats, time.perf_counter() - started)
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_stats.reset(token)
+
+    def check_budget(self, scope: Scope, stats: RequestStats):
+        budget = stats.query_budget if stats.query_budget is not None else settings.SQL_QUERY_BUDGET
+        over_queries = stats.queries > budget
+        over_duration = stats.db_seconds * 1000 > settings.SQL_DURATION_BUDGET_MS
+        if not over_queries and not over_duration:
+            return
+
+        repeated = "".join(f"\n  {count}x {statement}" for statement, count in stats.repeated())
+        summary = (
+            f"{scope['method']} {scope['path']} ran {stats.queries} queries in {stats.db_seconds * 1000:.1f} ms "
+            f"(budget {budget} queries, {settings.SQL_DURATION_BUDGET_MS:g} ms)"
+        )
+        logger.warning("%s%s", summary, repeated and f", repeated:{repeated}")
+        if over_queries and settings.SQL_BUDGET_STRICT:
+            raise QueryBudgetExceeded(summary + repeated)
@@ -0,0 +1,96 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAITERS = Gauge(
+    "db_pool_waiters",
+    "Callers currently waiting to acquire a pooled connection",
+    multiprocess_mode="livesum",
+)
+DB_POOL_ACQUIRE_SECONDS = Histogram(
+    "db_pool_acquire_seconds",
+    "Time spent acquiring a connection from the pool",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts",
+    "Pool acquisitions that gave up after DB_POOL_TIMEOUT",
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Database connections currently open, checked out or idle in the pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_MAX_CONNECTIONS = Gauge(
+    "db_pool_max_connections",
+    "Connections the pool may open, DB_POOL_SIZE plus DB_MAX_OVERFLOW",
+    multiprocess_mode="livesum",
+)
+DB_READ_SESSIONS = Counter(
+    "db_read_sessions",
+    "Sessions opened for GET endpoints, by where they read from: replica, primary (no healthy replica, or "
+    "the client wrote recently) or fallback (the chosen replica failed to connect)",
+    ["target"],
+)
+
+HTTP_REQUESTS = Counter(
+    "http_requests",
+    "HTTP requests handled, by route template and response status",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds",
+    "Time from receiving a request until its response is sent, by route template",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0),
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being handled",
+    multiprocess_mode="livesum",
+)
+
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections",
+    "Requests answered 503 by admission control, by route group and reason (queue_full or queue_timeout)",
+    ["group", "reason"],
+)
+ADMISSION_QUEUE_SECONDS = Histogram(
+    "admission_queue_seconds",
+    "Time requests waited for a slot of their route group, admitted or not",
+    ["group"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+RATE_LIMITED_REQUESTS = Counter(
+    "rate_limited_requests",
+    "Requests answered 429 because the client's token bucket was empty, by route group",
+    ["group"],
+)
+
+JOBS_PROCESSED = Counter(
+    "jobs_processed",
+    "Background job attempts, by kind and result: done, retry or dead (out of attempts)",
+    ["kind", "result"],
+)
+JOB_SECONDS = Histogram(
+    "job_seconds",
+    "Time background job handlers ran, by kind",
+    ["kind"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests",
+    "Lookups in named in-process caches, by result (hit or miss)",
+    ["cache", "result"],
+)
+
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds",
+    "How much later than scheduled a periodic event loop callback ran",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
@@ -0,0 +1,106 @@
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+from fastapi import APIRouter, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    generate_latest,
+    multiprocess,
+)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.commons.metrics import (
+    EVENT_LOOP_LAG_SECONDS,
+    HTTP_REQUEST_SECONDS,
+    HTTP_REQUESTS,
+    HTTP_REQUESTS_IN_PROGRESS,
+)
+
+
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+router = APIRouter()
+
+
+def multiprocess_dir() -> Optional[Path]:
+    """Set when several workers serve the app: each writes its metrics to files there and /metrics sums them."""
+    path = os.environ.get(MULTIPROC_DIR_ENV)
+    return Path(path) if path else None
+
+
+def mark_worker_dead() -> None:
+    """Removes this worker's live gauges (in-flight requests, pool connections) from the aggregate."""
+    if multiprocess_dir() is not None:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def metrics_registry() -> CollectorRegistry:
+    if multiprocess_dir() is None:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    # Sync route: reading the per-worker files runs in the threadpool, off the event loop
+    return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
+
+
+def route_template(scope: Scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if "endpoint" in scope:
+        # Plain Starlette routes (/docs, /openapi.json) have fixed paths
+        return scope["path"]
+    # Keeps unknown paths (scanners, typos) from creating a label each
+    return "<unmatched>"
+
+
+class MetricsMiddleware:
+    """Request count and latency by route template, and the number of requests in flight."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            route = route_template(scope)
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(scope["method"], route, str(status_code)).inc()
+
+
+async def monitor_event_loop(interval: float) -> None:
+    """
+    Sleeps ``interval`` seconds in a loop and records how late it wakes up. Lag means callbacks hog the
+    loop (sync work, CPU-bound serialization) and every request on this worker waits for them.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        scheduled = loop.time() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG_SECONDS.observe(max(loop.time() - scheduled, 0.0))
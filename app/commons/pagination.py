@@ -0,0 +1,126 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Generic, List, Optional, Sequence, TypeVar, Union
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, tuple_
+from sqlalchemy.orm import InstrumentedAttribute
+
+from app.commons.schemas import CursorPagination, Pagination
+
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Cursor:
+    created_at: datetime
+    id: int
+    backward: bool = False
+
+
+@dataclass
+class KeysetWindow(Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+
+
+def encode_cursor(created_at: datetime, id_: int, backward: bool = False) -> str:
+    payload = json.dumps([created_at.isoformat(), id_, int(backward)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(token: str) -> Cursor:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        created_at, id_, backward = json.loads(raw)
+        return Cursor(created_at=datetime.fromisoformat(created_at), id=int(id_), backward=bool(backward))
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def page_count(total: Optional[int], per_page: int) -> Optional[int]:
+    if total is None:
+        return None
+    return (total + per_page - 1) // per_page
+
+
+def keyset_condition(created_at: InstrumentedAttribute, id_: InstrumentedAttribute, cursor: Cursor):
+    key = tuple_(created_at, id_)
+    if cursor.backward:
+        return key > tuple_(cursor.created_at, cursor.id)
+    return key < tuple_(cursor.created_at, cursor.id)
+
+
+def keyset_order(created_at: InstrumentedAttribute, id_: InstrumentedAttribute, cursor: Optional[Cursor]) -> list:
+    if cursor is not None and cursor.backward:
+        return [created_at.asc(), id_.asc()]
+    return [created_at.desc(), id_.desc()]
+
+
+def keyset_paginate(
+    stmt: Select,
+    created_at: InstrumentedAttribute,
+    id_: InstrumentedAttribute,
+    per_page: int,
+    cursor: Optional[Cursor] = None,
+    offset: int = 0,
+) -> Select:
+    """
+    Orders ``stmt`` newest first by ``(created_at, id)`` and limits it to one page plus a look-ahead row.
+    With a cursor the page starts right after the cursor row (seek), otherwise ``offset`` is used.
+    """
+    stmt = stmt.order_by(*keyset_order(created_at, id_, cursor)).limit(per_page + 1)
+    if cursor is not None:
+        return stmt.where(keyset_condition(created_at, id_, cursor))
+    return stmt.offset(offset)
+
+
+def keyset_window(
+    rows: Sequence[T],
+    per_page: int,
+    cursor: Optional[Cursor] = None,
+    has_previous: bool = False,
+    key: Callable[[T], Any] = lambda row: (row.created_at, row.id),
+) -> KeysetWindow[T]:
+    """Trims the look-ahead row fetched by ``keyset_paginate`` and builds cursors for the neighbouring pages."""
+    has_more = len(rows) > per_page
+    items = list(rows[:per_page])
+    if cursor is not None and cursor.backward:
+        items.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, cursor is not None or has_previous
+
+    next_cursor = prev_cursor = None
+    if items and has_next:
+        next_cursor = encode_cursor(*key(items[-1]))
+    if items and has_prev:
+        prev_cursor = encode_cursor(*key(items[0]), backward=True)
+    return KeysetWindow(items=items, next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+
+def listing_page(
+    item_type: type,
+    items: List[Any],
+    per_page: int,
+    page: Optional[int],
+    total: Optional[int],
+    window: Optional[KeysetWindow] = None,
+) -> Union[Pagination, CursorPagination]:
+    """
+    ``Pagination`` for a numbered page of a counted listing, ``CursorPagination`` for a page reached by cursor
+    (``page`` None) or an uncounted one (``total`` None).
+    """
+    cursors = {"next_cursor": window.next_cursor, "prev_cursor": window.prev_cursor} if window else {}
+    if page is not None and total is not None:
+        return Pagination[item_type](
+            page=page, per_page=per_page, total_pages=page_count(total, per_page), total=total, items=items, **cursors
+        )
+    return CursorPagination[item_type](
+        per_page=per_page, total_pages=page_count(total, per_page), total=total, items=items, **cursors
+    )
@@ -0,0 +1,28 @@
+from typing import List, Optional
+
+from fastapi import HTTPException, Query, status
+
+
+MAX_BATCH_SIZE = 500
+MAX_BATCH_IDS = 100
+
+
+def batch_ids(
+    ids: Optional[List[str]] = Query(
+        default=None,
+        description=f"Fetch only these ids (comma separated or repeated, up to {MAX_BATCH_IDS}), pagination is ignored",
+    ),
+) -> Optional[List[int]]:
+    if ids is None:
+        return None
+    try:
+        parsed = [int(part) for value in ids for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="ids must be integers")
+    if not parsed:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="ids must not be empty")
+    if len(parsed) > MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"At most {MAX_BATCH_IDS} ids are allowed"
+        )
+    return list(dict.fromkeys(parsed))
@@ -0,0 +1,45 @@
+import json
+
+from fastapi import FastAPI
+
+from app.commons.settings import get_settings
+
+
+OPENAPI_FILE = "openapi.json"
+SCHEMA_HEADS_FILE = "schema_heads.json"
+
+
+def generate_openapi(app: FastAPI) -> dict:
+    from fastapi.openapi.utils import get_openapi
+
+    openapi_schema = get_openapi(
+        title="crossdo",
+        version="0.0.0",
+        description="crossdo backend",
+        routes=app.routes,
+    )
+    openapi_schema["components"]["securitySchemes"] = {
+        "bearerAuth": {"type": "http", "scheme": "bearer", "bearerFormat": "JWT"}
+    }
+    return openapi_schema
+
+
+def load_openapi() -> dict | None:
+    path = get_settings().BUILD_DIR / OPENAPI_FILE
+    if not path.exists():
+        return None
+    return json.loads(path.read_bytes())
+
+
+def write_openapi(app: FastAPI) -> None:
+    path = get_settings().BUILD_DIR / OPENAPI_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(generate_openapi(app), separators=(",", ":")))
+
+
+def write_schema_heads() -> None:
+    from app.commons.database import migration_heads
+
+    path = get_settings().BUILD_DIR / SCHEMA_HEADS_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(sorted(migration_heads())))
@@ -0,0 +1,72 @@
+import hashlib
+import itertools
+import time
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from app.commons.cache import TTLCache
+from app.commons.settings import ReplicaSelectionEnum
+
+
+class Replica:
+    def __init__(self, engine: AsyncEngine, cooldown: float):
+        self.engine = engine
+        self.session_maker = async_sessionmaker(engine, expire_on_commit=False)
+        self.cooldown = cooldown
+        self.unhealthy_until = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return self.unhealthy_until <= time.monotonic()
+
+    def mark_unhealthy(self) -> None:
+        self.unhealthy_until = time.monotonic() + self.cooldown
+
+    def connections_in_use(self) -> int:
+        return self.engine.sync_engine.pool.checkedout()
+
+
+class ReplicaSet:
+    """Picks the replica for the next read session; replicas that failed to connect sit out their cooldown."""
+
+    def __init__(self, replicas: list[Replica], selection: ReplicaSelectionEnum):
+        self.replicas = replicas
+        self.selection = selection
+        self._turn = itertools.count()
+
+    def choose(self) -> Optional[Replica]:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        if self.selection == ReplicaSelectionEnum.least_connections:
+            return min(healthy, key=Replica.connections_in_use)
+        return healthy[next(self._turn) % len(healthy)]
+
+
+class RecentWriters:
+    """
+    Clients (told apart by their Authorization header) that committed a write in the last ``window`` seconds.
+    Their reads go to the primary so they see their own changes despite replication lag. Kept per process:
+    with several workers a read served by another worker can still hit a lagging replica.
+    """
+
+    def __init__(self, window: float, maxsize: int = 10_000):
+        self.cache: TTLCache[bool] = TTLCache(maxsize=maxsize, ttl=window, name="recent_writers")
+
+    @staticmethod
+    def client_key(request: Request) -> Optional[bytes]:
+        authorization = request.headers.get("authorization")
+        if not authorization:
+            return None
+        return hashlib.blake2b(authorization.encode(), digest_size=16).digest()
+
+    def remember(self, request: Request) -> None:
+        key = self.client_key(request)
+        if key is not None:
+            self.cache.set(key, True)
+
+    def wrote_recently(self, request: Request) -> bool:
+        key = self.client_key(request)
+        return key is not None and self.cache.get(key) is not None
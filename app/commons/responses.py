@@ -0,0 +1,25 @@
+import time
+from typing import Any
+
+import pydantic_core
+from fastapi.responses import Response
+
+from app.commons.instrumentation import record_serialization
+
+
+class ModelResponse(Response):
+    """
+    JSON response for already validated pydantic models (or lists of them), serialized exactly once
+    and straight to bytes by pydantic-core.
+
+    Returning a response instance makes FastAPI skip its own response_model validation and
+    serialization, so routes keep ``response_model`` only for the OpenAPI schema.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        started = time.perf_counter()
+        body = pydantic_core.to_json(content)
+        record_serialization(time.perf_counter() - started)
+        return body
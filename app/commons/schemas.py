@@ -12,6 +12,32 @@ class Pagination(BaseModel, Generic[T]):
     total_pages: int
     total: int
     items: List[T]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
 
     class Config:
         arbitrary_types_allowed = True
+
+
+class CursorPagination(BaseModel, Generic[T]):
+    """
+    A page reached by cursor, which has no page number, or a page asked for with ``with_total=false``:
+    ``total`` and ``total_pages`` are null when the listing was not counted.
+    """
+
+    per_page: int
+    total_pages: Optional[int] = None
+    total: Optional[int] = None
+    items: List[T]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+
+class BatchItemResult(BaseModel, Generic[T]):
+    index: int
+    status: int
+    item: Optional[T] = None
+    detail: Optional[str] = None
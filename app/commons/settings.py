@@ -1,5 +1,7 @@
 from enum import StrEnum, unique
 from functools import lru_cache
+from pathlib import Path
+from typing import Literal, Optional
 
 from pydantic import ValidationError
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -11,6 +13,19 @@ class EnvironmentEnum(StrEnum):
     production = "production"
 
 
+@unique
+class ReplicaSelectionEnum(StrEnum):
+    round_robin = "round_robin"
+    least_connections = "least_connections"
+
+
+@unique
+class CountStrategyEnum(StrEnum):
+    exact = "exact"
+    cached = "cached"
+    estimated = "estimated"
+
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_prefix="")
 
@@ -18,12 +33,98 @@ class Settings(BaseSettings):
     LOG_LEVEL: str = "INFO"
     HOST: str = "0.0.0.0"
     PORT: int = 8000
+    # Worker processes, defaults to the CPUs available
+    WEB_CONCURRENCY: Optional[int] = None
+    # "auto" picks uvloop and httptools when installed (uvicorn[standard])
+    SERVER_LOOP: Literal["auto", "asyncio", "uvloop"] = "auto"
+    SERVER_HTTP: Literal["auto", "h11", "httptools"] = "auto"
+    # Restart a worker after this many requests (plus up to the jitter), unset to never restart
+    WORKER_MAX_REQUESTS: Optional[int] = None
+    WORKER_MAX_REQUESTS_JITTER: int = 0
+    # Seconds in-flight requests get to finish on SIGTERM, keep below the orchestrator's grace period
+    SHUTDOWN_TIMEOUT: float = 20.0
+    KEEP_ALIVE_TIMEOUT: int = 5
+    FORWARDED_ALLOW_IPS: str = "127.0.0.1"
     CORS_ORIGINS: str | list[str] = [""]
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_TIMEOUT: float = 10.0
+    DB_COMMAND_TIMEOUT: float | None = None
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_VERIFY_SCHEMA: bool = True
+    # Comma separated, GET endpoints read from these when set
+    DATABASE_REPLICA_URLS: str = ""
+    DB_REPLICA_SELECTION: ReplicaSelectionEnum = ReplicaSelectionEnum.round_robin
+    DB_REPLICA_CONNECT_TIMEOUT: float = 2.0
+    # Seconds a replica that failed to connect is skipped for
+    DB_REPLICA_COOLDOWN: float = 30.0
+    # Seconds after a write during which the same client reads from the primary
+    DB_READ_YOUR_WRITES_WINDOW: float = 5.0
+    # Artifacts written by `poetry run prebuild` (OpenAPI schema, migration heads)
+    BUILD_DIR: Path = Path(__file__).resolve().parents[2] / "build"
     GOOGLE_CLIENT_ID: str
     GOOGLE_CLIENT_SECRET: str
+    # Endpoints and signing keys of the provider, cached for as long as its Cache-Control allows, at most this
+    GOOGLE_DISCOVERY_URL: str = "https://accounts.google.com/.well-known/openid-configuration"
+    GOOGLE_METADATA_MAX_AGE: float = 6 * 3600
     SECRET_KEY: str
 
+    # Outgoing calls share one client per worker: connections kept alive, HTTP/2 where offered
+    HTTP_CLIENT_HTTP2: bool = True
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 20
+    HTTP_CLIENT_MAX_KEEPALIVE: int = 10
+    # Seconds an idle connection is kept open
+    HTTP_CLIENT_KEEPALIVE_EXPIRY: float = 60.0
+    HTTP_CLIENT_TIMEOUT: float = 10.0
+    HTTP_CLIENT_CONNECT_TIMEOUT: float = 3.0
+
+    PAGINATION_COUNT_STRATEGY: CountStrategyEnum = CountStrategyEnum.cached
+    PAGINATION_COUNT_TTL: float = 30.0
+    PAGINATION_COUNT_ESTIMATE_THRESHOLD: int = 100_000
+
+    USER_CACHE_SIZE: int = 10_000
+    USER_CACHE_TTL: float = 60.0
+
+    SERVER_TIMING_HEADER: bool = True
+    # Per request, routes can declare their own query count with `query_budget`
+    SQL_QUERY_BUDGET: int = 20
+    SQL_DURATION_BUDGET_MS: float = 250.0
+    # Raise instead of logging when a request goes over its query budget, meant for test runs
+    SQL_BUDGET_STRICT: bool = False
+
+    EVENT_LOOP_LAG_INTERVAL: float = 0.25
+
+    # Requests each route group runs at a time, 0 for no limit. Together they should stay within
+    # DB_POOL_SIZE + DB_MAX_OVERFLOW, so requests wait in the admission queue rather than on the pool
+    ADMISSION_COURSES_CONCURRENCY: int = 6
+    ADMISSION_STREAMS_CONCURRENCY: int = 6
+    ADMISSION_USERS_CONCURRENCY: int = 3
+    # Requests per group waiting for a slot, and for how many seconds at most, before answering 503
+    ADMISSION_QUEUE_SIZE: int = 50
+    ADMISSION_QUEUE_TIMEOUT: float = 2.0
+    ADMISSION_RETRY_AFTER: int = 1
+    # Token bucket per client and worker: requests per second and burst, unset to disable (429 when empty)
+    RATE_LIMIT_PER_SECOND: Optional[float] = None
+    RATE_LIMIT_BURST: int = 20
+
+    # Web workers run the jobs their requests commit in the background, sharing the database pool with
+    # requests; `poetry run jobs` drains what they leave (retries, jobs of crashed or busy workers)
+    JOBS_IN_PROCESS: bool = True
+    JOBS_CONCURRENCY: int = 2
+    # Jobs accepted by a process and not finished yet, the outbox worker takes the rest
+    JOBS_QUEUE_SIZE: int = 1000
+    JOBS_MAX_ATTEMPTS: int = 5
+    # Seconds before the first retry, doubled for every further attempt
+    JOBS_RETRY_BACKOFF: float = 2.0
+    # Seconds a job may run before another process can claim it again
+    JOBS_LEASE_SECONDS: float = 60.0
+    JOBS_POLL_INTERVAL: float = 1.0
+    # Seconds running jobs get on shutdown, after the requests; unfinished ones run again after their lease
+    JOBS_SHUTDOWN_TIMEOUT: float = 5.0
+
 
 @lru_cache
 def get_settings() -> Settings:
@@ -0,0 +1,54 @@
+"""Dialect shims, so the same statements run on PostgreSQL and on the SQLite (aiosqlite) dev/test setup."""
+
+import json
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import functions, sqltypes
+from sqlalchemy.types import TypeDecorator
+
+
+class IdArray(TypeDecorator):
+    impl = sqltypes.NullType
+    cache_ok = True
+
+    def process_result_value(self, value, dialect):
+        # SQLite hands back the JSON text built by json_group_array
+        if isinstance(value, str):
+            return json.loads(value)
+        return value
+
+
+class id_array_agg(functions.GenericFunction):
+    """Aggregates values into a list: ``array_agg`` on PostgreSQL, ``json_group_array`` on SQLite."""
+
+    type = IdArray()
+    inherit_cache = True
+
+
+@compiles(id_array_agg)
+def _compile_id_array_agg(element, compiler, **kw):
+    return f"array_agg({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(id_array_agg, "sqlite")
+def _compile_id_array_agg_sqlite(element, compiler, **kw):
+    return f"json_group_array({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(functions.now, "sqlite")
+def _compile_now_sqlite(element, compiler, **kw):
+    # Same text layout SQLAlchemy binds datetimes with on SQLite, so (created_at, id) keyset comparisons line up
+    return "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+
+
+async def insert_returning(db: AsyncSession, model, rows: list[dict]) -> list:
+    """
+    Inserts ``rows`` with one multi-row ``INSERT ... VALUES ... RETURNING`` and returns the new objects in their order.
+
+    Passed as executemany parameters with ``sort_by_parameter_order``, SQLAlchemy sends one INSERT per row on SQLite,
+    where RETURNING has no guaranteed order. Both backends assign ids in VALUES order, so sorting by id is enough.
+    """
+    created = (await db.scalars(insert(model).values(rows).returning(model))).all()
+    return sorted(created, key=lambda obj: obj.id)
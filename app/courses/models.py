@@ -1,11 +1,15 @@
 import uuid
 
 from sqlalchemy import (
+    DDL,
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     Text,
+    event,
+    literal_column,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, foreign, relationship
@@ -15,6 +19,19 @@ from app.commons.database import Base
 from app.users.models import User
 
 
+SEARCH_CONFIG = literal_column("'simple'::regconfig")
+
+
+def search_document(title, description):
+    """
+    Weighted tsvector a course is searched by (title A, description B). The GIN index is built over this
+    exact expression, so queries have to use it as is for PostgreSQL to pick the index.
+    """
+    return func.setweight(func.to_tsvector(SEARCH_CONFIG, title), literal_column("'A'")).op("||")(
+        func.setweight(func.to_tsvector(SEARCH_CONFIG, description), literal_column("'B'"))
+    )
+
+
 class Course(Base):
     __tablename__ = "courses"
 
@@ -26,12 +43,59 @@ class Course(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    # Review aggregates, maintained by the review endpoints in the same transaction as the reviews
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_1_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_2_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_3_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_4_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_5_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Relationships never load implicitly: read paths use explicit loader options or projections
     user: Mapped["User"] = relationship(
         primaryjoin=(foreign(User.id) == created_by),
-        lazy="selectin",
+        lazy="raise",
     )
-    course_streams = relationship("CourseStream", back_populates="course")
-    reviews: Mapped[list["Review"]] = relationship(back_populates="course")
+    course_streams = relationship("CourseStream", back_populates="course", lazy="raise")
+    reviews: Mapped[list["Review"]] = relationship(back_populates="course", lazy="raise")
+
+    __table_args__ = (
+        Index("ix_courses_created_at_id", created_at.desc(), id.desc()),
+        Index(
+            "ix_courses_search_document",
+            search_document(title, description),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+    )
+
+    @property
+    def rating(self) -> float:
+        return self.rating_sum / self.rating_count if self.rating_count else 0.0
+
+    @property
+    def review_count(self) -> int:
+        return self.rating_count
+
+
+# SQLite has no tsvector: an FTS5 table indexes the same columns and triggers keep it in sync with courses
+for statement in (
+    "CREATE VIRTUAL TABLE courses_fts USING fts5(title, description, content='courses', content_rowid='id')",
+    """CREATE TRIGGER courses_fts_ai AFTER INSERT ON courses BEGIN
+    INSERT INTO courses_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+END""",
+    """CREATE TRIGGER courses_fts_ad AFTER DELETE ON courses BEGIN
+    INSERT INTO courses_fts(courses_fts, rowid, title, description)
+    VALUES ('delete', old.id, old.title, old.description);
+END""",
+    """CREATE TRIGGER courses_fts_au AFTER UPDATE OF title, description ON courses BEGIN
+    INSERT INTO courses_fts(courses_fts, rowid, title, description)
+    VALUES ('delete', old.id, old.title, old.description);
+    INSERT INTO courses_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+END""",
+):
+    event.listen(Course.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Course.__table__, "before_drop", DDL("DROP TABLE IF EXISTS courses_fts").execute_if(dialect="sqlite"))
 
 
 class Review(Base):
@@ -44,5 +108,7 @@ class Review(Base):
     comment = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    course = relationship("Course", back_populates="reviews")
-    user = relationship("User")
+    course = relationship("Course", back_populates="reviews", lazy="raise")
+    user = relationship("User", lazy="raise")
+
+    __table_args__ = (Index("ix_reviews_course_id_created_at_id", course_id, created_at.desc(), id.desc()),)
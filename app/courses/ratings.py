@@ -0,0 +1,40 @@
+from collections import Counter
+from typing import Iterable
+
+from sqlalchemy import select, update
+from sqlalchemy.sql import func
+
+from app.courses.models import Course, Review
+
+
+def rating_column(stars: int):
+    return getattr(Course, f"rating_{stars}_count")
+
+
+def rating_increments(ratings: Iterable[int]) -> dict:
+    """UPDATE values that add ``ratings`` to the course aggregates without touching ``updated_at``."""
+    histogram = Counter(ratings)
+    values = {
+        Course.rating_sum: Course.rating_sum + sum(stars * n for stars, n in histogram.items()),
+        Course.rating_count: Course.rating_count + histogram.total(),
+        Course.updated_at: Course.updated_at,
+    }
+    for stars, n in histogram.items():
+        values[rating_column(stars)] = rating_column(stars) + n
+    return values
+
+
+def backfill_ratings_statement(course_ids: Iterable[int]):
+    """Recomputes the aggregates of ``course_ids`` from the reviews table in a single UPDATE."""
+
+    def reviews_of_course(column, *criteria):
+        return select(column).where(Review.course_id == Course.id, *criteria).scalar_subquery()
+
+    values = {
+        Course.rating_sum: func.coalesce(reviews_of_course(func.sum(Review.rating)), 0),
+        Course.rating_count: reviews_of_course(func.count()),
+        Course.updated_at: Course.updated_at,
+    }
+    for stars in range(1, 6):
+        values[rating_column(stars)] = reviews_of_course(func.count(), Review.rating == stars)
+    return update(Course).where(Course.id.in_(course_ids)).values(values)
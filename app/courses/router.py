@@ -1,27 +1,113 @@
-from typing import List
+from typing import List, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, status
+from sqlalchemy import and_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import load_only
 from sqlalchemy.sql import func
 
-from app.commons.database import get_async_session
+from app.commons.conditional import (
+    is_conditional,
+    is_not_modified,
+    latest,
+    make_etag,
+    not_modified_response,
+    validator_headers,
+)
+from app.commons.counting import count_total, invalidate_total
+from app.commons.database import get_async_session, get_read_session
+from app.commons.instrumentation import query_budget
 from app.commons.openapi import OPENAPI_SECURITY_EXTRA
-from app.commons.schemas import Pagination
+from app.commons.pagination import (
+    decode_cursor,
+    keyset_condition,
+    keyset_order,
+    keyset_paginate,
+    keyset_window,
+    listing_page,
+)
+from app.commons.params import MAX_BATCH_SIZE, batch_ids
+from app.commons.responses import ModelResponse
+from app.commons.schemas import BatchItemResult, CursorPagination, Pagination
+from app.commons.sql import insert_returning
 from app.courses import models
+from app.courses.ratings import rating_increments
+from app.courses.search import get_course_search
+from app.courses.shapes import EXPANDED_ITEMS, CourseShape, course_shape
+from app.courses_streams.models import CourseStream
+from app.courses_streams.router import construct_stream_row, stream_read_query
 from app.users.models import User
 from app.users.users import current_active_user
 
-from .schemas import CourseCreate, CourseRead, CourseUpdate, ReviewCreate, ReviewRead
+from .schemas import (
+    CourseAuthor,
+    CourseCreate,
+    CourseDetail,
+    CourseExpansion,
+    CourseRead,
+    CourseUpdate,
+    ReviewCreate,
+    ReviewRead,
+)
 
 
 router = APIRouter(prefix="/courses", tags=["Courses"])
 
 COURSE_SECURITY_MESSAGE = "Available only for course creator"
+COURSE_DETAIL_DESCRIPTION = (
+    "Every course field, or only those named in `fields` (`?fields=id,title,rating`): fields not asked for are "
+    "left out of the response. `expand` adds `author` (id and email) and the newest "
+    f"{EXPANDED_ITEMS} `reviews` and `streams`, each read with one more query. Unknown fields or expansions "
+    "answer 422."
+)
+
+
+def course_version_columns(shape: CourseShape):
+    """What a course detail in ``shape`` changes with, the author's email aside (read with ``read_author``)."""
+    last_review_at = (
+        select(func.max(models.Review.created_at)).where(models.Review.course_id == models.Course.id).scalar_subquery()
+    )
+    columns = [models.Course.updated_at, models.Course.rating_count, last_review_at.label("last_review_at")]
+    if shape.expands(CourseExpansion.streams):
+        course_streams = select(CourseStream.id).where(CourseStream.course_id == models.Course.id)
+        columns += [
+            course_streams.with_only_columns(func.max(CourseStream.updated_at)).scalar_subquery().label("streams_at"),
+            course_streams.with_only_columns(func.count()).scalar_subquery().label("stream_count"),
+        ]
+    if shape.expands(CourseExpansion.author):
+        columns.append(models.Course.created_by.label("author_id"))
+    return columns
+
+
+def course_validators(course_id, shape: CourseShape, version, author: Optional[CourseAuthor] = None):
+    """ETag and Last-Modified of a course detail; reviews change it through the rating aggregates."""
+    streams_at, stream_count = getattr(version, "streams_at", None), getattr(version, "stream_count", None)
+    etag = make_etag(
+        "course",
+        course_id,
+        shape.key,
+        version.updated_at.isoformat(),
+        version.rating_count,
+        streams_at and streams_at.isoformat(),
+        stream_count,
+        author and author.email,
+    )
+    return etag, latest(version.updated_at, version.last_review_at, streams_at)
+
 
+async def read_author(db: AsyncSession, user_id) -> CourseAuthor:
+    # By id rather than joined: on SQLite course and user ids are stored in different text forms
+    email = (await db.scalars(select(User.email).where(User.id == user_id))).one()
+    return CourseAuthor(id=user_id, email=email)
 
-@router.post("/", response_model=CourseRead, status_code=status.HTTP_201_CREATED, openapi_extra=OPENAPI_SECURITY_EXTRA)
+
+@router.post(
+    "/",
+    response_model=CourseRead,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra=OPENAPI_SECURITY_EXTRA,
+    dependencies=[Depends(query_budget(3))],
+)
 async def create_course(
     course: CourseCreate,
     user: User = Depends(current_active_user),
@@ -33,55 +119,167 @@ async def create_course(
     )
     db.add(db_course)
     await db.commit()
+    invalidate_total(models.Course)
     await db.refresh(db_course)
-    return db_course
+    return ModelResponse(CourseRead.model_validate(db_course), status_code=status.HTTP_201_CREATED)
 
 
-@router.get("/", response_model=Pagination[CourseRead], openapi_extra=OPENAPI_SECURITY_EXTRA)
-async def read_courses(
+@router.post(
+    "/batch",
+    response_model=List[BatchItemResult[CourseRead]],
+    status_code=status.HTTP_200_OK,
+    openapi_extra=OPENAPI_SECURITY_EXTRA,
+    dependencies=[Depends(query_budget(3))],
+)
+async def create_courses(
+    courses: List[CourseCreate] = Body(min_length=1, max_length=MAX_BATCH_SIZE),
     user: User = Depends(current_active_user),
     db: AsyncSession = Depends(get_async_session),
-    page: int = Query(default=1, ge=1, description="Page number starting from 1"),
+):
+    created = await insert_returning(db, models.Course, [{**c.model_dump(), "created_by": user.id} for c in courses])
+    await db.commit()
+    invalidate_total(models.Course)
+
+    return ModelResponse(
+        [
+            BatchItemResult[CourseRead](index=index, status=status.HTTP_201_CREATED, item=CourseRead.model_validate(c))
+            for index, c in enumerate(created)
+        ]
+    )
+
+
+@router.get(
+    "/",
+    response_model=Union[Pagination[CourseRead], CursorPagination[CourseRead]],
+    openapi_extra=OPENAPI_SECURITY_EXTRA,
+    dependencies=[Depends(query_budget(3))],
+)
+async def read_courses(
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_read_session),
+    ids: Optional[List[int]] = Depends(batch_ids),
+    page: int = Query(default=1, ge=1, description="Page number starting from 1, ignored when cursor is set"),
     per_page: int = Query(default=10, ge=1, le=100, description="Number of items per page"),
+    cursor: Optional[str] = Query(default=None, description="Continuation token from next_cursor or prev_cursor"),
+    with_total: bool = Query(default=True, description="Set to false to skip computing total and total_pages"),
 ):
-    total = (await db.scalars(select(func.count()).select_from(models.Course))).one()
+    if ids is not None:
+        courses = {c.id: c for c in await db.scalars(select(models.Course).where(models.Course.id.in_(ids)))}
+        items = [CourseRead.model_validate(courses[i]) for i in ids if i in courses]
+        return ModelResponse(
+            Pagination[CourseRead](page=1, per_page=len(ids), total_pages=1, total=len(items), items=items)
+        )
+
+    total = await count_total(db, models.Course, with_total)
+
+    keyset = decode_cursor(cursor) if cursor else None
+    stmt = keyset_paginate(
+        select(models.Course),
+        models.Course.created_at,
+        models.Course.id,
+        per_page,
+        cursor=keyset,
+        offset=(page - 1) * per_page,
+    )
+    courses = (await db.scalars(stmt)).all()
+    window = keyset_window(courses, per_page, cursor=keyset, has_previous=page > 1)
 
-    offset = (page - 1) * per_page
+    items = [CourseRead.model_validate(c) for c in window.items]
+    return ModelResponse(listing_page(CourseRead, items, per_page, None if keyset else page, total, window))
 
-    courses = (
-        await db.scalars(select(models.Course).order_by(models.Course.created_at.desc()).offset(offset).limit(per_page))
-    ).all()
 
-    return Pagination[CourseRead](
-        page=page,
-        per_page=per_page,
-        total_pages=(total + per_page - 1) // per_page,
-        total=total,
-        items=[CourseRead.model_validate(c) for c in courses],
+@router.get(
+    "/search",
+    response_model=Union[Pagination[CourseRead], CursorPagination[CourseRead]],
+    openapi_extra=OPENAPI_SECURITY_EXTRA,
+    dependencies=[Depends(query_budget(3))],
+)
+async def search_courses(
+    q: str = Query(min_length=1, max_length=200, description="Words to look for in course title and description"),
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_read_session),
+    page: int = Query(default=1, ge=1, description="Page number starting from 1"),
+    per_page: int = Query(default=10, ge=1, le=100, description="Number of items per page"),
+    with_total: bool = Query(default=True, description="Set to false to skip computing total and total_pages"),
+):
+    search = get_course_search(db.bind.dialect.name)
+    total = (await db.scalars(search.count(q))).one() if with_total else None
+    courses = (await db.scalars(search.matches(q).offset((page - 1) * per_page).limit(per_page))).all()
+
+    return ModelResponse(
+        listing_page(CourseRead, [CourseRead.model_validate(c) for c in courses], per_page, page, total)
     )
 
 
 @router.get(
     "/{course_id}",
-    response_model=CourseRead,
+    response_model=CourseDetail,
     status_code=status.HTTP_200_OK,
     openapi_extra=OPENAPI_SECURITY_EXTRA,
+    description=COURSE_DETAIL_DESCRIPTION,
+    dependencies=[Depends(query_budget(6))],
 )
 async def read_course(
-    course_id: int, user: User = Depends(current_active_user), db: AsyncSession = Depends(get_async_session)
+    course_id: int,
+    request: Request,
+    shape: CourseShape = Depends(course_shape),
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_read_session),
 ):
-    stmt = select(models.Course).options(selectinload(models.Course.reviews)).filter(models.Course.id == course_id)
-    result = await db.execute(stmt)
-    course = result.scalars().first()
+    author = None
+    if is_conditional(request):
+        stmt = select(*course_version_columns(shape)).where(models.Course.id == course_id)
+        version = (await db.execute(stmt)).first()
+        if not version:
+            raise HTTPException(status_code=404, detail="Course not found")
+        if shape.expands(CourseExpansion.author):
+            author = await read_author(db, version.author_id)
+        etag, last_modified = course_validators(course_id, shape, version, author)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified)
 
-    if not course:
+    # Only the columns of the requested fields; anything else raises instead of loading lazily
+    stmt = (
+        select(models.Course, *course_version_columns(shape))
+        .options(load_only(*shape.columns(), raiseload=True))
+        .where(models.Course.id == course_id)
+    )
+    row = (await db.execute(stmt)).first()
+
+    if not row:
         raise HTTPException(status_code=404, detail="Course not found")
 
-    return course
+    course = row.Course
+    content = {field: getattr(course, field) for field in shape.fields}
+    if shape.expands(CourseExpansion.author):
+        author = content["author"] = author or await read_author(db, course.created_by)
+    if shape.expands(CourseExpansion.reviews):
+        stmt = (
+            select(models.Review)
+            .where(models.Review.course_id == course_id)
+            .order_by(models.Review.created_at.desc(), models.Review.id.desc())
+            .limit(EXPANDED_ITEMS)
+        )
+        content["reviews"] = [ReviewRead.model_validate(review) for review in await db.scalars(stmt)]
+    if shape.expands(CourseExpansion.streams):
+        stmt = (
+            stream_read_query()
+            .where(CourseStream.course_id == course_id)
+            .order_by(CourseStream.created_at.desc(), CourseStream.id.desc())
+            .limit(EXPANDED_ITEMS)
+        )
+        content["streams"] = [construct_stream_row(stream) for stream in await db.execute(stmt)]
+
+    headers = validator_headers(*course_validators(course_id, shape, row, author))
+    return ModelResponse(content, headers=headers)
 
 
 @router.put(
-    "/{course_id}", response_model=CourseRead, status_code=status.HTTP_200_OK, openapi_extra=OPENAPI_SECURITY_EXTRA
+    "/{course_id}",
+    response_model=CourseRead,
+    status_code=status.HTTP_200_OK,
+    openapi_extra=OPENAPI_SECURITY_EXTRA,
+    dependencies=[Depends(query_budget(4))],
 )
 async def update_course(
     course_id: int,
@@ -104,7 +302,7 @@ async def update_course(
     db.add(course)
     await db.commit()
     await db.refresh(course)
-    return course
+    return ModelResponse(CourseRead.model_validate(course))
 
 
 @router.post(
@@ -112,6 +310,7 @@ async def update_course(
     response_model=ReviewRead,
     status_code=status.HTTP_201_CREATED,
     openapi_extra=OPENAPI_SECURITY_EXTRA,
+    dependencies=[Depends(query_budget(4))],
 )
 async def create_review(
     course_id: int,
@@ -119,8 +318,14 @@ async def create_review(
     user: User = Depends(current_active_user),
     db: AsyncSession = Depends(get_async_session),
 ):
-    course = await db.get(models.Course, course_id)
-    if not course:
+    stmt = (
+        update(models.Course)
+        .where(models.Course.id == course_id)
+        .values(rating_increments([review_data.rating]))
+        .returning(models.Course.id)
+        .execution_options(synchronize_session=False)
+    )
+    if (await db.execute(stmt)).first() is None:
         raise HTTPException(status_code=404, detail="Course not found")
 
     review = models.Review(course_id=course_id, user_id=user.id, rating=review_data.rating, comment=review_data.comment)
@@ -128,22 +333,78 @@ async def create_review(
     await db.commit()
     await db.refresh(review)
 
-    return review
+    return ModelResponse(ReviewRead.model_validate(review), status_code=status.HTTP_201_CREATED)
+
+
+@router.post(
+    "/{course_id}/reviews/batch",
+    response_model=List[BatchItemResult[ReviewRead]],
+    status_code=status.HTTP_200_OK,
+    openapi_extra=OPENAPI_SECURITY_EXTRA,
+    dependencies=[Depends(query_budget(4))],
+)
+async def create_reviews(
+    course_id: int,
+    reviews: List[ReviewCreate] = Body(min_length=1, max_length=MAX_BATCH_SIZE),
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    stmt = (
+        update(models.Course)
+        .where(models.Course.id == course_id)
+        .values(rating_increments(r.rating for r in reviews))
+        .returning(models.Course.id)
+        .execution_options(synchronize_session=False)
+    )
+    if (await db.execute(stmt)).first() is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+
+    rows = [{"course_id": course_id, "user_id": user.id, "rating": r.rating, "comment": r.comment} for r in reviews]
+    created = await insert_returning(db, models.Review, rows)
+    await db.commit()
+
+    return ModelResponse(
+        [
+            BatchItemResult[ReviewRead](index=index, status=status.HTTP_201_CREATED, item=ReviewRead.model_validate(r))
+            for index, r in enumerate(created)
+        ]
+    )
 
 
 @router.get(
     "/{course_id}/reviews",
-    response_model=List[ReviewRead],
+    response_model=CursorPagination[ReviewRead],
     status_code=status.HTTP_200_OK,
     openapi_extra=OPENAPI_SECURITY_EXTRA,
+    dependencies=[Depends(query_budget(3))],
 )
-async def read_reviews(course_id: int, db: AsyncSession = Depends(get_async_session)):
-    course = await db.get(models.Course, course_id)
-    if not course:
+async def read_reviews(
+    course_id: int,
+    db: AsyncSession = Depends(get_read_session),
+    per_page: int = Query(default=10, ge=1, le=100, description="Number of items per page"),
+    cursor: Optional[str] = Query(default=None, description="Continuation token from next_cursor or prev_cursor"),
+):
+    keyset = decode_cursor(cursor) if cursor else None
+
+    # Outer join from the course, so an existing course always yields a row even without (more) reviews
+    join_on = [models.Review.course_id == models.Course.id]
+    if keyset is not None:
+        join_on.append(keyset_condition(models.Review.created_at, models.Review.id, keyset))
+    stmt = (
+        select(models.Course.rating_count, models.Review)
+        .select_from(models.Course)
+        .outerjoin(models.Review, and_(*join_on))
+        .where(models.Course.id == course_id)
+        .order_by(*keyset_order(models.Review.created_at, models.Review.id, keyset))
+        .limit(per_page + 1)
+    )
+    rows = (await db.execute(stmt)).all()
+
+    if not rows:
         raise HTTPException(status_code=404, detail="Course not found")
 
-    stmt = select(models.Review).where(models.Review.course_id == course_id).order_by(models.Review.created_at.desc())
-    result = await db.execute(stmt)
-    reviews = result.scalars().all()
+    total = rows[0].rating_count
+    window = keyset_window([row.Review for row in rows if row.Review is not None], per_page, cursor=keyset)
 
-    return reviews
+    items = [ReviewRead.model_validate(r) for r in window.items]
+    return ModelResponse(listing_page(ReviewRead, items, per_page, None, total, window))
@@ -1,4 +1,5 @@
 from datetime import datetime
+from enum import StrEnum, unique
 from typing import Optional
 from uuid import UUID
 
@@ -6,6 +7,8 @@ from annotated_types import Ge, Le
 from pydantic import BaseModel, PositiveInt, StringConstraints
 from typing_extensions import Annotated
 
+from app.courses_streams.schemas import StreamRead
+
 
 class CourseBase(BaseModel):
     title: Annotated[str, StringConstraints(min_length=1, strip_whitespace=True)]
@@ -23,7 +26,8 @@ class CourseUpdate(CourseBase):
 
 class CourseRead(CourseBase, from_attributes=True):
     id: PositiveInt
-    # rating: float
+    rating: float
+    review_count: int
     created_at: datetime
     updated_at: datetime
 
@@ -37,11 +41,39 @@ class ReviewCreate(ReviewBase):
     pass
 
 
-class ReviewRead(ReviewBase):
+class ReviewRead(ReviewBase, from_attributes=True):
     id: PositiveInt
     course_id: PositiveInt
     user_id: UUID
     created_at: datetime
 
-    class Config:
-        orm_mode = True
+
+@unique
+class CourseExpansion(StrEnum):
+    reviews = "reviews"
+    streams = "streams"
+    author = "author"
+
+
+class CourseAuthor(BaseModel):
+    id: UUID
+    email: str
+
+
+class CourseDetail(BaseModel):
+    """
+    CourseRead fields (those picked by ``fields``, all by default) and the expansions asked for. Fields and
+    expansions that were not asked for are left out of the response, not sent as null.
+    """
+
+    id: Optional[PositiveInt] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    course_url: Optional[str] = None
+    rating: Optional[float] = None
+    review_count: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    author: Optional[CourseAuthor] = None
+    reviews: Optional[list[ReviewRead]] = None
+    streams: Optional[list[StreamRead]] = None
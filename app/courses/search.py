@@ -0,0 +1,82 @@
+from typing import Optional, Protocol
+
+from sqlalchemy import Select, false, literal_column, select
+from sqlalchemy.sql import func, table
+
+from app.courses.models import SEARCH_CONFIG, Course, search_document
+
+
+class CourseSearch(Protocol):
+    """Builds the statements behind ``GET /courses/search`` for one database dialect."""
+
+    def matches(self, q: str) -> Select: ...
+
+    def count(self, q: str) -> Select: ...
+
+
+class PostgresCourseSearch:
+    """``websearch_to_tsquery`` syntax (quoted phrases, ``or``, ``-word``) against the GIN-indexed document."""
+
+    def _query(self, q: str):
+        return func.websearch_to_tsquery(SEARCH_CONFIG, q)
+
+    def _matching(self, q: str):
+        return search_document(Course.title, Course.description).op("@@")(self._query(q))
+
+    def matches(self, q: str) -> Select:
+        rank = func.ts_rank(search_document(Course.title, Course.description), self._query(q))
+        return select(Course).where(self._matching(q)).order_by(rank.desc(), Course.id.desc())
+
+    def count(self, q: str) -> Select:
+        return select(func.count()).select_from(Course).where(self._matching(q))
+
+
+class SQLiteCourseSearch:
+    """FTS5 table maintained by triggers, ranked by bm25 with title weighted over description."""
+
+    fts = table("courses_fts", literal_column("rowid"))
+
+    def _matching(self, q: str):
+        query = fts_query(q)
+        if query is None:
+            return false()
+        return literal_column("courses_fts").op("MATCH")(query)
+
+    def matches(self, q: str) -> Select:
+        # bm25 is lower for better matches
+        rank = func.bm25(literal_column("courses_fts"), 10.0, 4.0)
+        return (
+            select(Course)
+            .join(self.fts, self.fts.c.rowid == Course.id)
+            .where(self._matching(q))
+            .order_by(rank, Course.id.desc())
+        )
+
+    def count(self, q: str) -> Select:
+        return select(func.count()).select_from(self.fts).where(self._matching(q))
+
+
+def fts_string(word: str) -> str:
+    return '"{}"'.format(word.replace('"', '""'))
+
+
+def fts_query(q: str) -> Optional[str]:
+    """
+    Every word becomes a quoted FTS5 string, so user input never reaches the query syntax. Words are ANDed
+    and ``-word`` excludes, like the PostgreSQL backend does.
+    """
+    include, exclude = [], []
+    for word in q.split():
+        if word.startswith("-") and len(word) > 1:
+            exclude.append(fts_string(word[1:]))
+        else:
+            include.append(fts_string(word))
+    if not include:
+        return None
+    return " NOT ".join([" ".join(include), *exclude])
+
+
+def get_course_search(dialect_name: str) -> CourseSearch:
+    if dialect_name == "sqlite":
+        return SQLiteCourseSearch()
+    return PostgresCourseSearch()
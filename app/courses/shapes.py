@@ -0,0 +1,74 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+from fastapi import HTTPException, Query, status
+
+from app.courses import models
+
+from .schemas import CourseExpansion
+
+
+# The columns each CourseRead field is read from
+FIELD_COLUMNS = {
+    "id": (models.Course.id,),
+    "title": (models.Course.title,),
+    "description": (models.Course.description,),
+    "course_url": (models.Course.course_url,),
+    "rating": (models.Course.rating_sum, models.Course.rating_count),
+    "review_count": (models.Course.rating_count,),
+    "created_at": (models.Course.created_at,),
+    "updated_at": (models.Course.updated_at,),
+}
+
+# Newest reviews and streams included by an expansion, the rest is paged through their own endpoints
+EXPANDED_ITEMS = 10
+
+
+@dataclass(frozen=True)
+class CourseShape:
+    fields: tuple[str, ...] = tuple(FIELD_COLUMNS)
+    expand: frozenset[CourseExpansion] = frozenset()
+
+    @property
+    def key(self) -> str:
+        return f"{','.join(self.fields)};{','.join(sorted(self.expand))}"
+
+    def expands(self, expansion: CourseExpansion) -> bool:
+        return expansion in self.expand
+
+    def columns(self) -> list:
+        """The course columns to load: those of the fields, the ETag's and the author id for ``author``."""
+        columns = [column for field in self.fields for column in FIELD_COLUMNS[field]]
+        columns += [models.Course.updated_at, models.Course.rating_count]
+        if self.expands(CourseExpansion.author):
+            columns.append(models.Course.created_by)
+        return list(dict.fromkeys(columns))
+
+
+def split_values(values: Optional[List[str]]) -> list[str]:
+    return [part.strip() for value in values or [] for part in value.split(",") if part.strip()]
+
+
+def course_shape(
+    fields: Optional[List[str]] = Query(
+        default=None, description="Course fields to return (comma separated or repeated), all by default"
+    ),
+    expand: Optional[List[str]] = Query(
+        default=None,
+        description=f"Also return {', '.join(CourseExpansion)} (comma separated or repeated); "
+        f"reviews and streams are the newest {EXPANDED_ITEMS}",
+    ),
+) -> CourseShape:
+    requested, expansions = split_values(fields), split_values(expand)
+    unknown = [f for f in requested if f not in FIELD_COLUMNS]
+    unknown += [e for e in expansions if e not in CourseExpansion.__members__]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown fields or expansions: {', '.join(unknown)}",
+        )
+    return CourseShape(
+        # Always in CourseRead order, so equal shapes get equal ETags
+        fields=tuple(f for f in FIELD_COLUMNS if f in requested) if requested else tuple(FIELD_COLUMNS),
+        expand=frozenset(CourseExpansion(e) for e in expansions),
+    )
@@ -0,0 +1,72 @@
+import uuid
+from dataclasses import dataclass, fields
+from typing import Optional
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy import false, true
+
+from app.courses_streams.models import CourseStream
+
+
+@dataclass(frozen=True)
+class StreamFilters:
+    course_id: Optional[int] = None
+    has_started: Optional[bool] = None
+    min_free_seats: Optional[int] = None
+    min_cost: Optional[int] = None
+    max_cost: Optional[int] = None
+    duration_weeks: Optional[int] = None
+    created_by: Optional[uuid.UUID] = None
+
+    @property
+    def active(self) -> bool:
+        return any(getattr(self, field.name) is not None for field in fields(self))
+
+    def conditions(self) -> list:
+        """
+        WHERE clauses for the set filters. ``has_started`` is rendered as a literal rather than a bound
+        parameter, so PostgreSQL can match it to the partial index on not started streams in generic
+        (prepared statement) plans too.
+        """
+        conditions = []
+        if self.course_id is not None:
+            conditions.append(CourseStream.course_id == self.course_id)
+        if self.has_started is not None:
+            conditions.append(CourseStream.has_started == (true() if self.has_started else false()))
+        if self.min_free_seats is not None:
+            conditions.append(CourseStream.max_participants - CourseStream.seats_taken >= self.min_free_seats)
+        if self.min_cost is not None:
+            conditions.append(CourseStream.total_cost >= self.min_cost)
+        if self.max_cost is not None:
+            conditions.append(CourseStream.total_cost <= self.max_cost)
+        if self.duration_weeks is not None:
+            conditions.append(CourseStream.duration_weeks == self.duration_weeks)
+        if self.created_by is not None:
+            conditions.append(CourseStream.created_by == self.created_by)
+        return conditions
+
+
+def stream_filters(
+    course_id: Optional[int] = Query(default=None, ge=1, description="Only streams of this course"),
+    has_started: Optional[bool] = Query(default=None, description="Only streams that have (or have not) started"),
+    min_free_seats: Optional[int] = Query(
+        default=None, ge=1, description="Only streams with at least this many seats left"
+    ),
+    min_cost: Optional[int] = Query(default=None, ge=0, description="Only streams costing at least this much"),
+    max_cost: Optional[int] = Query(default=None, ge=0, description="Only streams costing at most this much"),
+    duration_weeks: Optional[int] = Query(default=None, ge=1, description="Only streams lasting this many weeks"),
+    created_by: Optional[uuid.UUID] = Query(default=None, description="Only streams created by this user"),
+) -> StreamFilters:
+    if min_cost is not None and max_cost is not None and min_cost > max_cost:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="min_cost must not be greater than max_cost"
+        )
+    return StreamFilters(
+        course_id=course_id,
+        has_started=has_started,
+        min_free_seats=min_free_seats,
+        min_cost=min_cost,
+        max_cost=max_cost,
+        duration_weeks=duration_weeks,
+        created_by=created_by,
+    )
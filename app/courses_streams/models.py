@@ -1,4 +1,14 @@
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, Text
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    Text,
+    UniqueConstraint,
+    false,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, foreign, relationship
 from sqlalchemy.sql import func
@@ -17,19 +27,38 @@ class CourseStream(Base):
     name = Column(Text, nullable=False)
     description = Column(Text, nullable=True)
     start_date = Column(DateTime, nullable=True)
-    has_started = Column(Boolean, nullable=False, server_default="false")
+    has_started = Column(Boolean, nullable=False, server_default=false())
     total_cost = Column(Integer, nullable=False)
     min_participants = Column(Integer, nullable=False)
     max_participants = Column(Integer, nullable=False)
+    # Participants count, only ever changed by the conditional UPDATE that reserves a seat
+    seats_taken = Column(Integer, nullable=False, default=0, server_default="0")
     duration_weeks = Column(Integer, nullable=False)
     schedule = Column(Text, nullable=False)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
-    # course = relationship("Course", back_populates="course_streams")
-    course: Mapped[list["Course"]] = relationship(back_populates="course_streams", lazy="selectin")
-    participants: Mapped[list["Participant"]] = relationship(back_populates="stream", lazy="selectin")
+    # Relationships never load implicitly: read paths use the projection in the streams router
+    course: Mapped["Course"] = relationship(back_populates="course_streams", lazy="raise")
+    participants: Mapped[list["Participant"]] = relationship(back_populates="stream", lazy="raise")
+
+    # Filters of GET /streams/ keep the newest-first keyset order; seats_taken is left out of every index
+    # (and partial index predicate), so reserving a seat stays a HOT update
+    __table_args__ = (
+        Index("ix_course_streams_created_at_id", created_at.desc(), id.desc()),
+        Index("ix_course_streams_course_id_created_at_id", course_id, created_at.desc(), id.desc()),
+        Index("ix_course_streams_created_by_created_at_id", created_by, created_at.desc(), id.desc()),
+        Index(
+            "ix_course_streams_not_started_created_at_id",
+            created_at.desc(),
+            id.desc(),
+            postgresql_where=has_started == false(),
+            sqlite_where=has_started == false(),
+        ),
+        Index("ix_course_streams_duration_weeks_total_cost", duration_weeks, total_cost),
+        Index("ix_course_streams_total_cost", total_cost),
+    )
 
     class Config:
         orm_mode = True
@@ -41,10 +70,13 @@ class Participant(Base):
     id = Column(Integer, primary_key=True)
     user_id = Column(UUID(as_uuid=True), ForeignKey("user.id"), nullable=False)
     stream_id = Column(Integer, ForeignKey("course_streams.id"), nullable=False)
+    registered_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Определение обратной связи
     user: Mapped["User"] = relationship(
         primaryjoin=(foreign(User.id) == user_id),
-        lazy="selectin",
+        lazy="raise",
     )
-    stream: Mapped["CourseStream"] = relationship("CourseStream", back_populates="participants")
+    stream: Mapped["CourseStream"] = relationship("CourseStream", back_populates="participants", lazy="raise")
+
+    __table_args__ = (UniqueConstraint("stream_id", "user_id", name="uq_participants_stream_id_user_id"),)
@@ -1,18 +1,51 @@
 import datetime
-
-from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
-from sqlalchemy import delete, select
+from typing import List, NamedTuple, Optional, Union
+
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from sqlalchemy import delete, literal, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import func
 
-from app.commons.database import get_async_session
+from app.commons.conditional import (
+    is_conditional,
+    is_not_modified,
+    latest,
+    make_etag,
+    not_modified_response,
+    validator_headers,
+)
+from app.commons.counting import count_matching, count_total, invalidate_total
+from app.commons.database import get_async_session, get_read_session
+from app.commons.instrumentation import query_budget
 from app.commons.openapi import OPENAPI_SECURITY_EXTRA
-from app.commons.schemas import Pagination
+from app.commons.pagination import (
+    decode_cursor,
+    keyset_paginate,
+    keyset_window,
+    listing_page,
+)
+from app.commons.params import MAX_BATCH_SIZE, batch_ids
+from app.commons.responses import ModelResponse
+from app.commons.schemas import BatchItemResult, CursorPagination, Pagination
+from app.commons.sql import id_array_agg, insert_returning
 from app.courses import models as courses_models
 from app.courses_streams import models as streams_models
+from app.jobs.outbox import enqueue
 from app.users.models import User
 from app.users.users import current_active_user
 
+from .filters import StreamFilters, stream_filters
 from .schemas import StreamCreate, StreamRead, StreamUpdate
 
 
@@ -20,7 +53,141 @@ router = APIRouter(prefix="/streams", tags=["Streams"])
 COURSE_STREAMS_SECURITY_MESSAGE = "Available only for course stream creator"
 
 
-def construct_stream(user_id, course_title, new_stream):
+def stream_read_query():
+    """
+    Everything StreamRead needs in one statement: the stream row, the course title and author,
+    and the participant ids aggregated into an array.
+    """
+    participant_ids = (
+        select(id_array_agg(streams_models.Participant.user_id))
+        .where(streams_models.Participant.stream_id == streams_models.CourseStream.id)
+        .scalar_subquery()
+    )
+    return select(
+        streams_models.CourseStream,
+        courses_models.Course.created_by.label("leader_id"),
+        courses_models.Course.title.label("course_title"),
+        courses_models.Course.updated_at.label("course_updated_at"),
+        participant_ids.label("participant_ids"),
+    ).join(courses_models.Course, courses_models.Course.id == streams_models.CourseStream.course_id)
+
+
+def stream_version_query(stream_id):
+    return (
+        select(
+            streams_models.CourseStream.updated_at,
+            streams_models.CourseStream.seats_taken,
+            courses_models.Course.updated_at.label("course_updated_at"),
+        )
+        .join(courses_models.Course, courses_models.Course.id == streams_models.CourseStream.course_id)
+        .where(streams_models.CourseStream.id == stream_id)
+    )
+
+
+def stream_validators(stream_id, updated_at, seats_taken, course_updated_at):
+    """ETag and Last-Modified of a stream detail; joins bump updated_at and seats_taken, renames the course."""
+    etag = make_etag("stream", stream_id, updated_at.isoformat(), seats_taken, course_updated_at.isoformat())
+    return etag, latest(updated_at, course_updated_at)
+
+
+class SeatReservation(NamedTuple):
+    stream_id: Optional[int]
+    joined: int
+    seats_taken: Optional[int]
+    min_participants: Optional[int] = None
+    max_participants: Optional[int] = None
+
+
+def reserve_seat_query(stream_id, user_id):
+    """
+    Joins the stream in one statement: inserts the participant unless already joined, then takes a seat
+    only while seats_taken < max_participants. The row lock on the stream serializes concurrent joins.
+    Returns the stream id (NULL if missing), whether a participant row was inserted and the new seats_taken
+    (NULL if the stream was full, in which case the transaction must be rolled back).
+    """
+    joined = (
+        pg_insert(streams_models.Participant)
+        .from_select(
+            ["user_id", "stream_id"],
+            select(literal(user_id, streams_models.Participant.user_id.type), streams_models.CourseStream.id).where(
+                streams_models.CourseStream.id == stream_id
+            ),
+        )
+        .on_conflict_do_nothing(
+            index_elements=[streams_models.Participant.stream_id, streams_models.Participant.user_id]
+        )
+        .returning(streams_models.Participant.stream_id)
+        .cte("joined")
+    )
+    seat = (
+        update(streams_models.CourseStream)
+        .where(
+            streams_models.CourseStream.id.in_(select(joined.c.stream_id)),
+            streams_models.CourseStream.seats_taken < streams_models.CourseStream.max_participants,
+        )
+        .values(seats_taken=streams_models.CourseStream.seats_taken + 1)
+        .returning(
+            streams_models.CourseStream.seats_taken,
+            streams_models.CourseStream.min_participants,
+            streams_models.CourseStream.max_participants,
+        )
+        .cte("seat")
+    )
+    return select(
+        select(streams_models.CourseStream.id)
+        .where(streams_models.CourseStream.id == stream_id)
+        .scalar_subquery()
+        .label("stream_id"),
+        select(func.count()).select_from(joined).scalar_subquery().label("joined"),
+        select(seat.c.seats_taken).scalar_subquery().label("seats_taken"),
+        select(seat.c.min_participants).scalar_subquery().label("min_participants"),
+        select(seat.c.max_participants).scalar_subquery().label("max_participants"),
+    )
+
+
+async def reserve_seat(db: AsyncSession, stream_id, user_id):
+    if db.bind.dialect.name == "postgresql":
+        return (await db.execute(reserve_seat_query(stream_id, user_id))).one()
+
+    # SQLite has no data-modifying CTEs, but it serializes writers, so the same steps can run one by one
+    found = (
+        await db.scalars(select(streams_models.CourseStream.id).where(streams_models.CourseStream.id == stream_id))
+    ).first()
+    if found is None:
+        return SeatReservation(None, 0, None)
+    stmt = (
+        sqlite_insert(streams_models.Participant)
+        .values(user_id=user_id, stream_id=stream_id)
+        .on_conflict_do_nothing(
+            index_elements=[streams_models.Participant.stream_id, streams_models.Participant.user_id]
+        )
+        .returning(streams_models.Participant.id)
+    )
+    if (await db.execute(stmt)).first() is None:
+        return SeatReservation(stream_id, 0, None)
+    stmt = (
+        update(streams_models.CourseStream)
+        .where(
+            streams_models.CourseStream.id == stream_id,
+            streams_models.CourseStream.seats_taken < streams_models.CourseStream.max_participants,
+        )
+        .values(seats_taken=streams_models.CourseStream.seats_taken + 1)
+        .returning(
+            streams_models.CourseStream.seats_taken,
+            streams_models.CourseStream.min_participants,
+            streams_models.CourseStream.max_participants,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    seat = (await db.execute(stmt)).first()
+    return SeatReservation(stream_id, 1, *seat) if seat else SeatReservation(stream_id, 1, None)
+
+
+def construct_stream_row(row):
+    return construct_stream(row.leader_id, row.course_title, row.CourseStream, row.participant_ids)
+
+
+def construct_stream(user_id, course_title, new_stream, participant_ids=None):
     return StreamRead(
         id=new_stream.id,
         course_id=new_stream.course_id,
@@ -37,7 +204,7 @@ def construct_stream(user_id, course_title, new_stream):
         created_at=new_stream.created_at,
         updated_at=new_stream.updated_at,
         has_started=new_stream.has_started,
-        participants=[p.user_id for p in new_stream.participants],
+        participants=participant_ids or [],
     )
 
 
@@ -46,6 +213,7 @@ def construct_stream(user_id, course_title, new_stream):
     response_model=StreamRead,
     status_code=status.HTTP_201_CREATED,
     openapi_extra=OPENAPI_SECURITY_EXTRA,
+    dependencies=[Depends(query_budget(5))],
 )
 async def create_stream(
     stream: StreamCreate,
@@ -64,54 +232,139 @@ async def create_stream(
     )
     db.add(new_stream)
     await db.commit()
+    invalidate_total(streams_models.CourseStream)
     await db.refresh(new_stream)
-    return construct_stream(user.id, course.title, new_stream)
+    return ModelResponse(
+        construct_stream(user.id, course.title, new_stream, participant_ids=[]), status_code=status.HTTP_201_CREATED
+    )
 
 
-@router.get("/", response_model=Pagination[StreamRead], openapi_extra=OPENAPI_SECURITY_EXTRA)
-async def read_streams(
+@router.post(
+    "/batch",
+    response_model=List[BatchItemResult[StreamRead]],
+    status_code=status.HTTP_200_OK,
+    openapi_extra=OPENAPI_SECURITY_EXTRA,
+    dependencies=[Depends(query_budget(4))],
+)
+async def create_streams(
+    streams: List[StreamCreate] = Body(min_length=1, max_length=MAX_BATCH_SIZE),
     user: User = Depends(current_active_user),
     db: AsyncSession = Depends(get_async_session),
-    page: int = Query(default=1, ge=1, description="Page number starting from 1"),
-    per_page: int = Query(default=10, ge=1, le=100, description="Number of items per page"),
 ):
-    total = (await db.scalars(select(func.count()).select_from(streams_models.CourseStream))).one()
+    course_ids = {s.course_id for s in streams}
+    course_titles = dict(
+        (
+            await db.execute(
+                select(courses_models.Course.id, courses_models.Course.title).where(
+                    courses_models.Course.id.in_(course_ids)
+                )
+            )
+        ).all()
+    )
+
+    results = [
+        BatchItemResult[StreamRead](index=index, status=status.HTTP_404_NOT_FOUND, detail="Course not found")
+        for index, s in enumerate(streams)
+    ]
+    valid = [index for index, s in enumerate(streams) if s.course_id in course_titles]
+    if valid:
+        rows = [{**streams[index].model_dump(), "created_by": user.id, "start_date": None} for index in valid]
+        created = await insert_returning(db, streams_models.CourseStream, rows)
+        await db.commit()
+        invalidate_total(streams_models.CourseStream)
+
+        for index, new_stream in zip(valid, created):
+            results[index] = BatchItemResult[StreamRead](
+                index=index,
+                status=status.HTTP_201_CREATED,
+                item=construct_stream(user.id, course_titles[new_stream.course_id], new_stream, participant_ids=[]),
+            )
+    return ModelResponse(results)
 
-    offset = (page - 1) * per_page
 
-    streams = (
-        await db.scalars(
-            select(streams_models.CourseStream)
-            .order_by(streams_models.CourseStream.created_at.desc())
-            .offset(offset)
-            .limit(per_page)
+@router.get(
+    "/",
+    response_model=Union[Pagination[StreamRead], CursorPagination[StreamRead]],
+    openapi_extra=OPENAPI_SECURITY_EXTRA,
+    dependencies=[Depends(query_budget(3))],
+)
+async def read_streams(
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_read_session),
+    ids: Optional[List[int]] = Depends(batch_ids),
+    page: int = Query(default=1, ge=1, description="Page number starting from 1, ignored when cursor is set"),
+    per_page: int = Query(default=10, ge=1, le=100, description="Number of items per page"),
+    cursor: Optional[str] = Query(default=None, description="Continuation token from next_cursor or prev_cursor"),
+    with_total: bool = Query(default=True, description="Set to false to skip computing total and total_pages"),
+    filters: StreamFilters = Depends(stream_filters),
+):
+    if ids is not None:
+        stmt = stream_read_query().where(streams_models.CourseStream.id.in_(ids))
+        rows = {row.CourseStream.id: row for row in await db.execute(stmt)}
+        items = [construct_stream_row(rows[i]) for i in ids if i in rows]
+        return ModelResponse(
+            Pagination[StreamRead](page=1, per_page=len(ids), total_pages=1, total=len(items), items=items)
         )
-    ).all()
-
-    return Pagination[StreamRead](
-        page=page,
-        per_page=per_page,
-        total_pages=(total + per_page - 1) // per_page,
-        total=total,
-        items=[construct_stream(s.course.user.id, s.course.title, s) for s in streams],
+
+    conditions = filters.conditions()
+    if filters.active:
+        total = await count_matching(db, streams_models.CourseStream, conditions, with_total)
+    else:
+        total = await count_total(db, streams_models.CourseStream, with_total)
+
+    keyset = decode_cursor(cursor) if cursor else None
+    stmt = keyset_paginate(
+        stream_read_query().where(*conditions),
+        streams_models.CourseStream.created_at,
+        streams_models.CourseStream.id,
+        per_page,
+        cursor=keyset,
+        offset=(page - 1) * per_page,
+    )
+    rows = (await db.execute(stmt)).all()
+    window = keyset_window(
+        rows,
+        per_page,
+        cursor=keyset,
+        has_previous=page > 1,
+        key=lambda row: (row.CourseStream.created_at, row.CourseStream.id),
     )
 
+    items = [construct_stream_row(row) for row in window.items]
+    return ModelResponse(listing_page(StreamRead, items, per_page, None if keyset else page, total, window))
+
 
 @router.get(
     "/{stream_id}",
     response_model=StreamRead,
     status_code=status.HTTP_200_OK,
     openapi_extra=OPENAPI_SECURITY_EXTRA,
+    dependencies=[Depends(query_budget(3))],
 )
-async def read_stream(stream_id: int, db: AsyncSession = Depends(get_async_session)):
-    stmt = select(streams_models.CourseStream).where(streams_models.CourseStream.id == stream_id)
-    result = await db.execute(stmt)
-    stream = result.scalars().first()
-
-    if not stream:
+async def read_stream(
+    stream_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_read_session),
+):
+    if is_conditional(request):
+        version = (await db.execute(stream_version_query(stream_id))).first()
+        if not version:
+            raise HTTPException(status_code=404, detail="Stream not found")
+        etag, last_modified = stream_validators(stream_id, *version)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified)
+
+    stmt = stream_read_query().where(streams_models.CourseStream.id == stream_id)
+    row = (await db.execute(stmt)).first()
+
+    if not row:
         raise HTTPException(status_code=404, detail="Stream not found")
 
-    return construct_stream(stream.course.user.id, stream.course.title, stream)
+    stream = row.CourseStream
+    headers = validator_headers(
+        *stream_validators(stream_id, stream.updated_at, stream.seats_taken, row.course_updated_at)
+    )
+    return ModelResponse(construct_stream_row(row), headers=headers)
 
 
 @router.put(
@@ -119,6 +372,7 @@ async def read_stream(stream_id: int, db: AsyncSession = Depends(get_async_sessi
     response_model=StreamRead,
     status_code=status.HTTP_200_OK,
     openapi_extra=OPENAPI_SECURITY_EXTRA,
+    dependencies=[Depends(query_budget(5))],
 )
 async def update_stream(
     stream_id: int,
@@ -136,6 +390,8 @@ async def update_stream(
     if stream.created_by != user.id:
         raise HTTPException(status_code=403, detail="Not authorized to update this stream")
 
+    starts_now = stream_data.has_started and not stream.has_started
+
     for key, value in stream_data.dict(exclude_unset=True).items():
         setattr(stream, key, value)
 
@@ -144,10 +400,14 @@ async def update_stream(
         stream.has_started = True
 
     db.add(stream)
+    if starts_now:
+        enqueue(db, "stream_started", stream_id=stream_id)
     await db.commit()
-    await db.refresh(stream)
 
-    return construct_stream(stream.course.user.id, stream.course.title, stream)
+    stmt = (
+        stream_read_query().where(streams_models.CourseStream.id == stream_id).execution_options(populate_existing=True)
+    )
+    return ModelResponse(construct_stream_row((await db.execute(stmt)).first()))
 
 
 @router.delete(
@@ -155,6 +415,7 @@ async def update_stream(
     status_code=status.HTTP_204_NO_CONTENT,
     openapi_extra=OPENAPI_SECURITY_EXTRA,
     description=COURSE_STREAMS_SECURITY_MESSAGE,
+    dependencies=[Depends(query_budget(4))],
 )
 async def delete_stream(
     stream_id: int,
@@ -179,6 +440,7 @@ async def delete_stream(
     stmt = delete(streams_models.CourseStream).where(streams_models.CourseStream.id == stream_id)
     result = await db.execute(stmt)
     await db.commit()
+    invalidate_total(streams_models.CourseStream)
     return
 
 
@@ -186,26 +448,28 @@ async def delete_stream(
     "/{stream_id}/participate",
     status_code=status.HTTP_201_CREATED,
     openapi_extra=OPENAPI_SECURITY_EXTRA,
+    dependencies=[Depends(query_budget(5))],
 )
 async def participate_in_stream(
     stream_id: int,
     user: User = Depends(current_active_user),
     db: AsyncSession = Depends(get_async_session),
 ):
-    stream = await db.get(streams_models.CourseStream, stream_id)
-    if not stream:
-        raise HTTPException(status_code=404, detail="Stream not found")
+    result = await reserve_seat(db, stream_id, user.id)
 
-    existing_participant = await db.execute(
-        select(streams_models.Participant).where(
-            streams_models.Participant.user_id == user.id, streams_models.Participant.stream_id == stream_id
-        )
-    )
-    if existing_participant.scalars().first():
+    if result.stream_id is None:
+        raise HTTPException(status_code=404, detail="Stream not found")
+    if not result.joined:
         raise HTTPException(status_code=400, detail="User already participates in this stream")
-
-    new_participant = streams_models.Participant(user_id=user.id, stream_id=stream_id)
-    db.add(new_participant)
+    if result.seats_taken is None:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Stream is full")
+
+    # Committed with the seat, run after the response
+    if result.seats_taken == result.min_participants:
+        enqueue(db, "stream_min_participants_reached", stream_id=stream_id, participants=result.seats_taken)
+    if result.seats_taken == result.max_participants:
+        enqueue(db, "stream_filled", stream_id=stream_id, participants=result.seats_taken)
     await db.commit()
 
     return Response(status_code=status.HTTP_201_CREATED)
@@ -0,0 +1,121 @@
+import csv
+import io
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional, Sequence
+
+import pydantic_core
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Column, RowMapping, Select, Table, select
+
+from app.commons.database import open_read_session
+from app.commons.openapi import OPENAPI_SECURITY_EXTRA
+from app.courses.models import Course, Review
+from app.courses_streams.models import CourseStream, Participant
+from app.users.models import User
+from app.users.users import current_superuser
+
+from .schemas import ExportFormat, ExportResource
+
+
+router = APIRouter(prefix="/exports", tags=["Exports"])
+
+# Rows fetched from the server-side cursor at a time, and rows per chunk written to the response
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {ExportFormat.ndjson: "application/x-ndjson", ExportFormat.csv: "text/csv"}
+
+
+@dataclass(frozen=True)
+class ExportSource:
+    table: Table
+    # Compared with ``updated_since``
+    changed_at: Column
+
+
+EXPORT_SOURCES = {
+    ExportResource.courses: ExportSource(Course.__table__, Course.updated_at),
+    # Reviews are never edited
+    ExportResource.reviews: ExportSource(Review.__table__, Review.created_at),
+    ExportResource.streams: ExportSource(CourseStream.__table__, CourseStream.updated_at),
+    ExportResource.participants: ExportSource(Participant.__table__, Participant.registered_at),
+}
+
+
+def export_query(source: ExportSource, updated_since: Optional[datetime]) -> Select:
+    stmt = select(source.table).order_by(source.table.c.id)
+    if updated_since is not None:
+        if updated_since.tzinfo is None:
+            updated_since = updated_since.replace(tzinfo=timezone.utc)
+        stmt = stmt.where(source.changed_at >= updated_since)
+    return stmt.execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+
+async def export_batches(request: Request, stmt: Select) -> AsyncIterator[Sequence[RowMapping]]:
+    """
+    Rows of ``stmt`` from a server-side cursor, ``EXPORT_BATCH_SIZE`` at a time. Opens its own read session:
+    the request's dependencies are closed before a streaming response starts sending.
+    """
+    async with await open_read_session(request) as session:
+        result = await session.stream(stmt)
+        async for batch in result.mappings().partitions():
+            yield batch
+
+
+async def ndjson_chunks(batches: AsyncIterator[Sequence[RowMapping]]) -> AsyncIterator[bytes]:
+    async for batch in batches:
+        yield b"".join(pydantic_core.to_json(dict(row)) + b"\n" for row in batch)
+
+
+def csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def csv_chunks(columns: list[str], batches: AsyncIterator[Sequence[RowMapping]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for batch in batches:
+        writer.writerows([csv_value(row[column]) for column in columns] for row in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+@router.get(
+    "/{resource}",
+    response_class=StreamingResponse,
+    responses={200: {"content": {media_type: {} for media_type in MEDIA_TYPES.values()}}},
+    openapi_extra=OPENAPI_SECURITY_EXTRA,
+)
+async def export(
+    request: Request,
+    resource: ExportResource,
+    export_format: ExportFormat = Query(default=ExportFormat.ndjson, alias="format"),
+    updated_since: Optional[datetime] = Query(
+        default=None,
+        description="Only rows created or changed at or after this time (UTC unless an offset is given), "
+        "for incremental pulls",
+    ),
+    user: User = Depends(current_superuser),
+):
+    """
+    Every row of a table ordered by id, streamed as NDJSON (one object per line) or CSV with a header row.
+    Available only for superusers.
+    """
+    source = EXPORT_SOURCES[resource]
+    batches = export_batches(request, export_query(source, updated_since))
+    if export_format == ExportFormat.csv:
+        body = csv_chunks([column.name for column in source.table.columns], batches)
+    else:
+        body = ndjson_chunks(batches)
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{resource}.{export_format}"'},
+    )
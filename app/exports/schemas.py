@@ -0,0 +1,15 @@
+from enum import StrEnum, unique
+
+
+@unique
+class ExportResource(StrEnum):
+    courses = "courses"
+    reviews = "reviews"
+    streams = "streams"
+    participants = "participants"
+
+
+@unique
+class ExportFormat(StrEnum):
+    ndjson = "ndjson"
+    csv = "csv"
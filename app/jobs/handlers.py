@@ -0,0 +1,38 @@
+import logging
+
+from app.jobs.outbox import job
+
+
+logger = logging.getLogger(__name__)
+
+# Nothing sends mail yet: these log what a notification would say
+
+
+@job("user_registered")
+async def user_registered(payload: dict):
+    logger.info("User %s has registered.", payload["user_id"])
+
+
+@job("password_reset_requested", secret_keys=("token",))
+async def password_reset_requested(payload: dict):
+    logger.info("User %s has forgot their password. Reset token: %s", payload["user_id"], payload["token"])
+
+
+@job("verification_requested", secret_keys=("token",))
+async def verification_requested(payload: dict):
+    logger.info("Verification requested for user %s. Verification token: %s", payload["user_id"], payload["token"])
+
+
+@job("stream_min_participants_reached")
+async def stream_min_participants_reached(payload: dict):
+    logger.info("Stream %s has reached its minimum of %s participants.", payload["stream_id"], payload["participants"])
+
+
+@job("stream_filled")
+async def stream_filled(payload: dict):
+    logger.info("Stream %s is full with %s participants.", payload["stream_id"], payload["participants"])
+
+
+@job("stream_started")
+async def stream_started(payload: dict):
+    logger.info("Stream %s has started.", payload["stream_id"])
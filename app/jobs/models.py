@@ -0,0 +1,41 @@
+from enum import StrEnum, unique
+
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, Text
+from sqlalchemy.sql import func
+
+from app.commons.database import Base
+
+
+@unique
+class JobStatus(StrEnum):
+    pending = "pending"
+    # Out of attempts, kept for inspection until requeued or deleted by hand
+    dead = "dead"
+
+
+class OutboxJob(Base):
+    """
+    A side effect committed together with the change that caused it. Rows are deleted once their job ran;
+    ``locked_until`` is the lease of the process running it, after which another one may claim it again.
+    """
+
+    __tablename__ = "outbox_jobs"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(Text, nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(Text, nullable=False, default=JobStatus.pending, server_default=JobStatus.pending)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    run_after = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index(
+            "ix_outbox_jobs_pending_run_after",
+            run_after,
+            postgresql_where=status == JobStatus.pending,
+            sqlite_where=status == JobStatus.pending,
+        ),
+    )
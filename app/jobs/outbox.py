@@ -0,0 +1,165 @@
+import asyncio
+import datetime
+import logging
+import time
+from functools import lru_cache
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import delete, event, inspect, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.commons.database import get_session_maker
+from app.commons.metrics import JOB_SECONDS, JOBS_PROCESSED
+from app.commons.settings import get_settings
+from app.jobs.models import JobStatus, OutboxJob
+from app.jobs.queue import JobQueue
+
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+Handler = Callable[[dict], Awaitable[None]]
+HANDLERS: dict[str, Handler] = {}
+# Payload keys of a job kind holding secrets, such as tokens, blanked once the job is dead
+SECRET_KEYS: dict[str, tuple[str, ...]] = {}
+REDACTED = "[redacted]"
+
+# Jobs added to a session, submitted to the in-process queue once it commits
+SESSION_JOBS_KEY = "outbox_jobs"
+
+
+def job(kind: str, secret_keys: tuple[str, ...] = ()) -> Callable[[Handler], Handler]:
+    """
+    Registers the handler of a job kind. Handlers may run more than once, so they should be idempotent.
+    ``secret_keys`` are payload keys not kept once the job is dead (done jobs are deleted).
+    """
+
+    def register(handler: Handler) -> Handler:
+        HANDLERS[kind] = handler
+        SECRET_KEYS[kind] = secret_keys
+        return handler
+
+    return register
+
+
+def utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def enqueue(db: AsyncSession, kind: str, **payload) -> OutboxJob:
+    """Adds a job to the session: it is stored, and later runs, only if the session commits."""
+    outbox_job = OutboxJob(kind=kind, payload=payload, run_after=utcnow())
+    db.add(outbox_job)
+    db.info.setdefault(SESSION_JOBS_KEY, []).append(outbox_job)
+    return outbox_job
+
+
+async def enqueue_committed(kind: str, **payload) -> None:
+    """
+    Stores a job in a transaction of its own, for callers whose change is already committed. Committing it in
+    the caller's session would also commit whatever else is pending there.
+    """
+    async with get_session_maker()() as db:
+        enqueue(db, kind, **payload)
+        await db.commit()
+
+
+@event.listens_for(Session, "after_commit")
+def _submit_committed_jobs(session: Session):
+    for outbox_job in session.info.pop(SESSION_JOBS_KEY, []):
+        # The identity key is known after the flush, reading it does not load anything
+        get_job_queue().submit(inspect(outbox_job).identity[0])
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_jobs(session: Session):
+    session.info.pop(SESSION_JOBS_KEY, None)
+
+
+def due_jobs(now: datetime.datetime):
+    return select(OutboxJob.id).where(
+        OutboxJob.status == JobStatus.pending,
+        OutboxJob.run_after <= now,
+        or_(OutboxJob.locked_until.is_(None), OutboxJob.locked_until < now),
+    )
+
+
+async def due_job_ids(db: AsyncSession, limit: int) -> list[int]:
+    stmt = due_jobs(utcnow()).order_by(OutboxJob.run_after).limit(limit)
+    return list((await db.scalars(stmt)).all())
+
+
+async def claim(db: AsyncSession, job_id: int) -> Optional[OutboxJob]:
+    """Leases a due job to this process, unless another one holds it; counts the attempt."""
+    now = utcnow()
+    # SKIP LOCKED: a job another process is claiming right now is theirs (SQLite serializes writers anyway)
+    claimable = due_jobs(now).where(OutboxJob.id == job_id).with_for_update(skip_locked=True)
+    stmt = (
+        update(OutboxJob)
+        .where(OutboxJob.id.in_(claimable.scalar_subquery()))
+        .values(
+            locked_until=now + datetime.timedelta(seconds=settings.JOBS_LEASE_SECONDS),
+            attempts=OutboxJob.attempts + 1,
+        )
+        .returning(OutboxJob.kind, OutboxJob.payload, OutboxJob.attempts)
+        .execution_options(synchronize_session=False)
+    )
+    row = (await db.execute(stmt)).first()
+    await db.commit()
+    return OutboxJob(id=job_id, kind=row.kind, payload=row.payload, attempts=row.attempts) if row else None
+
+
+def redacted(kind: str, payload: dict) -> dict:
+    return {key: REDACTED if key in SECRET_KEYS.get(kind, ()) else value for key, value in payload.items()}
+
+
+def retry_delay(attempts: int) -> float:
+    return settings.JOBS_RETRY_BACKOFF * 2 ** (attempts - 1)
+
+
+async def finish(db: AsyncSession, outbox_job: OutboxJob, error: Optional[str]) -> str:
+    if error is None:
+        await db.execute(delete(OutboxJob).where(OutboxJob.id == outbox_job.id))
+        result = "done"
+    elif outbox_job.attempts >= settings.JOBS_MAX_ATTEMPTS:
+        stmt = update(OutboxJob).where(OutboxJob.id == outbox_job.id)
+        payload = redacted(outbox_job.kind, outbox_job.payload)
+        await db.execute(stmt.values(status=JobStatus.dead, payload=payload, locked_until=None, last_error=error))
+        result = "dead"
+    else:
+        run_after = utcnow() + datetime.timedelta(seconds=retry_delay(outbox_job.attempts))
+        stmt = update(OutboxJob).where(OutboxJob.id == outbox_job.id)
+        await db.execute(stmt.values(run_after=run_after, locked_until=None, last_error=error))
+        result = "retry"
+    await db.commit()
+    return result
+
+
+async def run_job(job_id: int) -> None:
+    async with get_session_maker()() as db:
+        outbox_job = await claim(db, job_id)
+        if outbox_job is None:
+            return
+
+        started = time.perf_counter()
+        error = None
+        try:
+            handler = HANDLERS.get(outbox_job.kind)
+            if handler is None:
+                raise LookupError(f"No handler for job kind {outbox_job.kind!r}")
+            # Within the lease, so no other process starts the same job meanwhile
+            await asyncio.wait_for(handler(outbox_job.payload), settings.JOBS_LEASE_SECONDS)
+        except Exception as e:  # noqa: B902 any failure of a job is retried
+            error = f"{type(e).__name__}: {e}"
+            logger.warning("Job %s (%s) failed, attempt %s: %s", job_id, outbox_job.kind, outbox_job.attempts, error)
+        JOB_SECONDS.labels(outbox_job.kind).observe(time.perf_counter() - started)
+
+        result = await finish(db, outbox_job, error)
+        JOBS_PROCESSED.labels(outbox_job.kind, result).inc()
+
+
+@lru_cache
+def get_job_queue() -> JobQueue:
+    return JobQueue(run_job, concurrency=settings.JOBS_CONCURRENCY, maxsize=settings.JOBS_QUEUE_SIZE)
@@ -0,0 +1,46 @@
+import asyncio
+from typing import Awaitable, Callable
+
+
+class JobQueue:
+    """
+    Runs jobs as background tasks of the event loop, ``concurrency`` at a time, with at most ``maxsize``
+    accepted and not yet finished. A job that is not accepted (queue full or stopped) stays in the outbox
+    for the outbox worker, so submitting never waits.
+    """
+
+    def __init__(self, run: Callable[[int], Awaitable[None]], concurrency: int, maxsize: int):
+        self.run = run
+        self.maxsize = maxsize
+        self.accepting = False
+        self.tasks: set[asyncio.Task] = set()
+        self._slots = asyncio.Semaphore(concurrency)
+
+    def start(self) -> None:
+        self.accepting = True
+
+    def submit(self, job_id: int) -> bool:
+        if not self.accepting or len(self.tasks) >= self.maxsize:
+            return False
+        task = asyncio.get_running_loop().create_task(self._run(job_id))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return True
+
+    async def _run(self, job_id: int) -> None:
+        async with self._slots:
+            await self.run(job_id)
+
+    async def join(self) -> None:
+        while self.tasks:
+            await asyncio.wait(set(self.tasks))
+
+    async def stop(self, timeout: float) -> None:
+        """Takes no more jobs and gives the accepted ones ``timeout`` seconds; cancelled jobs run again later."""
+        self.accepting = False
+        if not self.tasks:
+            return
+        _, unfinished = await asyncio.wait(set(self.tasks), timeout=timeout)
+        for task in unfinished:
+            task.cancel()
+        await asyncio.gather(*unfinished, return_exceptions=True)
@@ -1,11 +1,27 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import APIRouter, Depends, FastAPI
+from fastapi.middleware.cors import CORSMiddleware
 
-from app.commons.database import create_db_and_tables
+from app.commons.admission import AdmissionControlMiddleware
+from app.commons.database import dispose_engines, verify_schema_revision
+from app.commons.http import close_http_client
+from app.commons.instrumentation import QueryInstrumentationMiddleware
+from app.commons.monitoring import (
+    MetricsMiddleware,
+    mark_worker_dead,
+    monitor_event_loop,
+)
+from app.commons.monitoring import router as monitoring_router
 from app.commons.openapi import OPENAPI_SECURITY_EXTRA
+from app.commons.prebuild import generate_openapi, load_openapi
+from app.commons.settings import get_settings
 from app.courses.router import router as courses_router
 from app.courses_streams.router import router as streams_router
+from app.exports.router import router as exports_router
+from app.jobs import handlers  # noqa: F401  registers the job handlers
+from app.jobs.outbox import get_job_queue
 from app.users.models import User
 from app.users.schemas import UserCreate, UserRead, UserUpdate
 from app.users.users import (
@@ -15,13 +31,24 @@ from app.users.users import (
     fastapi_users,
     google_oauth_client,
 )
-from fastapi.middleware.cors import CORSMiddleware
+
+
+settings = get_settings()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await create_db_and_tables()
+    await verify_schema_revision()
+    app.openapi_schema = load_openapi()
+    loop_monitor = asyncio.create_task(monitor_event_loop(settings.EVENT_LOOP_LAG_INTERVAL))
+    if settings.JOBS_IN_PROCESS:
+        get_job_queue().start()
     yield
+    loop_monitor.cancel()
+    await get_job_queue().stop(settings.JOBS_SHUTDOWN_TIMEOUT)
+    await close_http_client()
+    await dispose_engines()
+    mark_worker_dead()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -30,18 +57,8 @@ app = FastAPI(lifespan=lifespan)
 def custom_openapi():
     if app.openapi_schema:
         return app.openapi_schema
-    from fastapi.openapi.utils import get_openapi
-
-    openapi_schema = get_openapi(
-        title="crossdo",
-        version="0.0.0",
-        description="crossdo backend",
-        routes=app.routes,
-    )
-    openapi_schema["components"]["securitySchemes"] = {
-        "bearerAuth": {"type": "http", "scheme": "bearer", "bearerFormat": "JWT"}
-    }
-    app.openapi_schema = openapi_schema
+    # Prefer the schema written by `poetry run prebuild`, generating it takes a while for the first /docs hit
+    app.openapi_schema = load_openapi() or generate_openapi(app)
     return app.openapi_schema
 
 
@@ -60,14 +77,22 @@ app.include_router(
 
 app.include_router(courses_router)
 app.include_router(streams_router)
+app.include_router(exports_router)
+app.include_router(monitoring_router)
 
+# Inside CORS, so browsers can read the 503 and 429 answers
+app.add_middleware(AdmissionControlMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["Content-Type", "Authorization"],
+    expose_headers=["Server-Timing", "Retry-After"],
 )
+app.add_middleware(QueryInstrumentationMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 
 @app.get("/authenticated-route", openapi_extra=OPENAPI_SECURITY_EXTRA)
 async def authenticated_route(user: User = Depends(current_active_user)):
@@ -0,0 +1,46 @@
+import uuid
+from typing import Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.commons.cache import TTLCache
+from app.commons.settings import get_settings
+from app.users.models import User
+
+
+settings = get_settings()
+
+# Per-process cache of active users resolved from access tokens. Writes through the user manager
+# invalidate entries locally; other workers see changes once USER_CACHE_TTL expires.
+user_cache: TTLCache[User] = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL, name="users")
+
+
+def _detached_copy(instance, **relationships):
+    mapper = inspect(instance).mapper
+    copy = mapper.class_(**{attr.key: getattr(instance, attr.key) for attr in mapper.column_attrs}, **relationships)
+    make_transient_to_detached(copy)
+    return copy
+
+
+def snapshot_user(user: User) -> User:
+    """Copies ``user`` and its OAuth accounts into detached instances that no session will mutate."""
+    return _detached_copy(user, oauth_accounts=[_detached_copy(account) for account in user.oauth_accounts])
+
+
+async def get_cached_user(session: AsyncSession, user_id: uuid.UUID) -> Optional[User]:
+    snapshot = user_cache.get(user_id)
+    if snapshot is None:
+        return None
+    # Attach a private copy to this request's session without a SELECT
+    return await session.merge(snapshot, load=False)
+
+
+def cache_user(user: User) -> None:
+    if user.is_active:
+        user_cache.set(user.id, snapshot_user(user))
+
+
+def invalidate_user(user_id: uuid.UUID) -> None:
+    user_cache.invalidate(user_id)
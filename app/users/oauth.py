@@ -0,0 +1,123 @@
+import asyncio
+import contextlib
+import logging
+import re
+from typing import Any, Callable, Optional
+
+import httpx
+import jwt
+from httpx_oauth.clients.google import BASE_SCOPES, GoogleOAuth2
+from httpx_oauth.oauth2 import GetAccessTokenError, OAuth2Token
+
+from app.commons.cache import TTLCache
+from app.commons.http import get_http_client
+from app.commons.settings import get_settings
+
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+def max_age(response: httpx.Response) -> float:
+    """Seconds a response may be cached for: its Cache-Control max-age, at most GOOGLE_METADATA_MAX_AGE."""
+    match = MAX_AGE.search(response.headers.get("cache-control", ""))
+    if match is None:
+        return settings.GOOGLE_METADATA_MAX_AGE
+    return min(float(match.group(1)), settings.GOOGLE_METADATA_MAX_AGE)
+
+
+class CachedGoogleOAuth2(GoogleOAuth2):
+    """
+    Google client on the worker's shared HTTP client, with the endpoints and signing keys of Google's discovery
+    document cached. The ``openid`` scope adds an ID token to the token response: verified against the cached
+    keys, it gives the account id and email without the People API call every login made before.
+    """
+
+    def __init__(self, client_id: str, client_secret: str, discovery_url: str):
+        super().__init__(client_id, client_secret, scopes=[*BASE_SCOPES, "openid"])
+        self.discovery_url = discovery_url
+        self.metadata: TTLCache[Any] = TTLCache(maxsize=8, name="oauth_metadata")
+        # (account id, email) read from ID tokens, until the callback asks for them by access token
+        self.identities: TTLCache[tuple[str, str]] = TTLCache(maxsize=10_000, ttl=60)
+        self._fetching = asyncio.Lock()
+
+    def get_httpx_client(self) -> contextlib.AbstractAsyncContextManager[httpx.AsyncClient]:
+        # Left open after each call, the lifespan closes it
+        return contextlib.nullcontext(get_http_client())
+
+    async def fetch(self, url: str, parse: Callable[[Any], Any] = lambda document: document) -> Any:
+        """``url`` as JSON, passed through ``parse`` and cached. Logins on a cold cache wait for a single fetch."""
+        cached = self.metadata.get(url)
+        if cached is not None:
+            return cached
+        async with self._fetching:
+            cached = self.metadata.get(url)
+            if cached is None:
+                async with self.get_httpx_client() as client:
+                    response = await client.get(url, headers=self.request_headers)
+                response.raise_for_status()
+                cached = parse(response.json())
+                self.metadata.set(url, cached, ttl=max_age(response))
+        return cached
+
+    async def discover(self) -> Optional[dict]:
+        """Points the client at the discovered endpoints; keeps the built-in ones when Google cannot be reached."""
+        try:
+            discovery = await self.fetch(self.discovery_url)
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning("Could not load the OAuth discovery document: %r", e)
+            return None
+        self.authorize_endpoint = discovery["authorization_endpoint"]
+        self.access_token_endpoint = self.refresh_token_endpoint = discovery["token_endpoint"]
+        self.revoke_token_endpoint = discovery.get("revocation_endpoint", self.revoke_token_endpoint)
+        return discovery
+
+    async def signing_key(self, jwks_uri: str, kid: Optional[str]) -> jwt.PyJWK:
+        keys = await self.fetch(jwks_uri, jwt.PyJWKSet.from_dict)
+        try:
+            return keys[kid]
+        except KeyError:
+            # Google publishes a new key before signing with it: an unknown one means our copy is stale
+            self.metadata.invalidate(jwks_uri)
+            return (await self.fetch(jwks_uri, jwt.PyJWKSet.from_dict))[kid]
+
+    async def verify_id_token(self, id_token: str, discovery: dict) -> dict:
+        try:
+            key = await self.signing_key(discovery["jwks_uri"], jwt.get_unverified_header(id_token).get("kid"))
+            claims = jwt.decode(id_token, key.key, algorithms=["RS256"], audience=self.client_id)
+        except (jwt.PyJWTError, KeyError) as e:
+            raise GetAccessTokenError(f"Invalid ID token: {e!r}") from e
+        # Google issues tokens with both forms of its issuer
+        if claims.get("iss") not in (discovery["issuer"], discovery["issuer"].removeprefix("https://")):
+            raise GetAccessTokenError("Invalid ID token: unexpected issuer")
+        return claims
+
+    async def get_authorization_url(self, redirect_uri: str, *args, **kwargs) -> str:
+        await self.discover()
+        return await super().get_authorization_url(redirect_uri, *args, **kwargs)
+
+    async def get_access_token(self, code: str, redirect_uri: str, code_verifier: Optional[str] = None) -> OAuth2Token:
+        discovery = await self.discover()
+        token = await super().get_access_token(code, redirect_uri, code_verifier)
+        if discovery is None or "id_token" not in token:
+            return token
+        try:
+            claims = await self.verify_id_token(token["id_token"], discovery)
+        except httpx.HTTPError as e:
+            logger.warning("Could not load the OAuth signing keys: %r", e)
+            return token
+        if claims.get("email") and claims.get("email_verified"):
+            # The People API names an account people/<Google account id>, which is what account_id holds
+            self.identities.set(token["access_token"], (f"people/{claims['sub']}", claims["email"]))
+        return token
+
+    async def get_id_email(self, token: str) -> tuple[str, Optional[str]]:
+        identity = self.identities.get(token)
+        if identity is None:
+            # No verified ID token for this login, ask the People API
+            return await super().get_id_email(token)
+        self.identities.invalidate(token)
+        return identity
@@ -1,40 +1,89 @@
 import os
 import uuid
-from typing import Optional
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
 
-from fastapi import Depends, Request
-from fastapi_users import BaseUserManager, FastAPIUsers, UUIDIDMixin
+import jwt
+from fastapi import Depends, Request, Response
+from fastapi_users import BaseUserManager, FastAPIUsers, UUIDIDMixin, exceptions
 from fastapi_users.authentication import (
     AuthenticationBackend,
     BearerTransport,
     JWTStrategy,
 )
 from fastapi_users.db import SQLAlchemyUserDatabase
-from httpx_oauth.clients.google import GoogleOAuth2
+from fastapi_users.jwt import decode_jwt
 
 from app.commons.settings import get_settings
+from app.jobs.outbox import enqueue_committed
+from app.users.cache import cache_user, get_cached_user, invalidate_user
 from app.users.models import User, get_user_db
 
 
+if TYPE_CHECKING:
+    from app.users.oauth import CachedGoogleOAuth2
+
+
 settings = get_settings()
 
 SECRET = settings.SECRET_KEY
 
-google_oauth_client = GoogleOAuth2(settings.GOOGLE_CLIENT_ID, settings.GOOGLE_CLIENT_SECRET)
+
+@lru_cache
+def get_google_oauth_client() -> "CachedGoogleOAuth2":
+    from app.users.oauth import CachedGoogleOAuth2
+
+    return CachedGoogleOAuth2(settings.GOOGLE_CLIENT_ID, settings.GOOGLE_CLIENT_SECRET, settings.GOOGLE_DISCOVERY_URL)
+
+
+class LazyGoogleOAuth2:
+    """
+    What the OAuth router is built with: building it only reads the provider name, everything else resolves to
+    get_google_oauth_client(), so importing the app creates no client and the first login does.
+    """
+
+    name = "google"
+
+    def __getattr__(self, attr: str):
+        return getattr(get_google_oauth_client(), attr)
+
+
+google_oauth_client = LazyGoogleOAuth2()
 
 
 class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
     reset_password_token_secret = SECRET
     verification_token_secret = SECRET
 
+    # Notifications go through the outbox: the request only stores them (app/jobs/handlers.py). fastapi-users
+    # has committed the user's changes by the time it calls these hooks, so the job gets a transaction of its own
+    async def notify(self, kind: str, user: User, **payload):
+        await enqueue_committed(kind, user_id=str(user.id), **payload)
+
     async def on_after_register(self, user: User, request: Optional[Request] = None):
-        print(f"User {user.id} has registered.")
+        await self.notify("user_registered", user)
 
     async def on_after_forgot_password(self, user: User, token: str, request: Optional[Request] = None):
-        print(f"User {user.id} has forgot their password. Reset token: {token}")
+        await self.notify("password_reset_requested", user, token=token)
 
     async def on_after_request_verify(self, user: User, token: str, request: Optional[Request] = None):
-        print(f"Verification requested for user {user.id}. Verification token: {token}")
+        await self.notify("verification_requested", user, token=token)
+
+    async def on_after_update(self, user: User, update_dict: dict, request: Optional[Request] = None):
+        invalidate_user(user.id)
+
+    async def on_after_verify(self, user: User, request: Optional[Request] = None):
+        invalidate_user(user.id)
+
+    async def on_after_reset_password(self, user: User, request: Optional[Request] = None):
+        invalidate_user(user.id)
+
+    async def on_after_login(self, user: User, request: Optional[Request] = None, response: Optional[Response] = None):
+        # OAuth logins may have refreshed the stored provider tokens
+        invalidate_user(user.id)
+
+    async def on_after_delete(self, user: User, request: Optional[Request] = None):
+        invalidate_user(user.id)
 
 
 async def get_user_manager(user_db: SQLAlchemyUserDatabase = Depends(get_user_db)):
@@ -44,8 +93,33 @@ async def get_user_manager(user_db: SQLAlchemyUserDatabase = Depends(get_user_db
 bearer_transport = BearerTransport(tokenUrl="auth/jwt/login")
 
 
+class CachedJWTStrategy(JWTStrategy[User, uuid.UUID]):
+    """JWT strategy that resolves the token subject from the in-process user cache before the database."""
+
+    async def read_token(self, token: Optional[str], user_manager: UserManager) -> Optional[User]:
+        if token is None:
+            return None
+
+        try:
+            data = decode_jwt(token, self.decode_key, self.token_audience, algorithms=[self.algorithm])
+            user_id = user_manager.parse_id(data["sub"])
+        except (jwt.PyJWTError, KeyError, exceptions.InvalidID):
+            return None
+
+        user = await get_cached_user(user_manager.user_db.session, user_id)
+        if user is not None:
+            return user
+
+        try:
+            user = await user_manager.get(user_id)
+        except exceptions.UserNotExists:
+            return None
+        cache_user(user)
+        return user
+
+
 def get_jwt_strategy() -> JWTStrategy:
-    return JWTStrategy(secret=SECRET, lifetime_seconds=3600)
+    return CachedJWTStrategy(secret=SECRET, lifetime_seconds=3600)
 
 
 auth_backend = AuthenticationBackend(
@@ -57,3 +131,4 @@ auth_backend = AuthenticationBackend(
 fastapi_users = FastAPIUsers[User, uuid.UUID](get_user_manager, [auth_backend])
 
 current_active_user = fastapi_users.current_user(active=True)
+current_superuser = fastapi_users.current_user(active=True, superuser=True)
@@ -0,0 +1,150 @@
+"""
+Micro-benchmark of the response path for 100-item list pages.
+
+"before" replays what FastAPI did when endpoints returned models: validate each row, then
+revalidate and serialize the whole page through the route's response_model and JSONResponse.
+"after" is the ModelResponse path: validate each row once and serialize straight to bytes.
+
+    poetry run python -m bench.serialization
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Union, get_args, get_origin
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from app.commons.pagination import listing_page
+from app.commons.responses import ModelResponse
+from app.courses.models import Course, Review
+from app.courses.schemas import CourseRead, ReviewRead
+from app.courses_streams.router import construct_stream
+from app.courses_streams.schemas import StreamRead
+from app.main import app
+
+
+def make_courses(n: int) -> list[Course]:
+    now = datetime.now(timezone.utc)
+    return [
+        Course(
+            id=i,
+            created_by=uuid.uuid4(),
+            title=f"Course {i}",
+            description="A reasonably long course description " * 4,
+            course_url=f"https://example.com/courses/{i}",
+            rating_sum=4 * i,
+            rating_count=i,
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(1, n + 1)
+    ]
+
+
+def make_reviews(n: int) -> list[Review]:
+    now = datetime.now(timezone.utc)
+    return [
+        Review(id=i, course_id=1, user_id=uuid.uuid4(), rating=1 + i % 5, comment="Useful course " * 5, created_at=now)
+        for i in range(1, n + 1)
+    ]
+
+
+def make_stream_rows(n: int) -> list[SimpleNamespace]:
+    now = datetime.now(timezone.utc)
+    return [
+        SimpleNamespace(
+            leader_id=uuid.uuid4(),
+            course_title=f"Course {i}",
+            participant_ids=[uuid.uuid4() for _ in range(10)],
+            stream=SimpleNamespace(
+                id=i,
+                course_id=i,
+                name=f"Stream {i}",
+                description="Stream description",
+                total_cost=1000,
+                min_participants=2,
+                max_participants=20,
+                duration_weeks=6,
+                schedule="Mon, Wed 19:00",
+                start_date=None,
+                created_at=now,
+                updated_at=now,
+                has_started=False,
+            ),
+        )
+        for i in range(1, n + 1)
+    ]
+
+
+def response_field(name: str, page):
+    """The route's response field, provided the route still declares the schema the bench builds its pages with."""
+    route = next(r for r in app.routes if isinstance(r, APIRoute) and r.name == name)
+    declared = get_args(route.response_model) if get_origin(route.response_model) is Union else (route.response_model,)
+    if type(page) not in declared:
+        sys.exit(f"{name} declares {route.response_model}, the bench builds {type(page).__name__}")
+    return route.secure_cloned_response_field
+
+
+async def measure(label: str, build, field, rounds: int, per_page: int) -> float:
+    async def before() -> bytes:
+        content = await serialize_response(field=field, response_content=build(), is_coroutine=True)
+        return JSONResponse(content).body
+
+    async def after() -> bytes:
+        return ModelResponse(build()).body
+
+    results = {}
+    for name, path in (("before", before), ("after", after)):
+        await path()
+        started = time.perf_counter()
+        for _ in range(rounds):
+            await path()
+        results[name] = (time.perf_counter() - started) / rounds / per_page * 1e6
+
+    speedup = results["before"] / results["after"]
+    print(
+        f"{label:<8} before {results['before']:7.2f} us/item   "
+        f"after {results['after']:7.2f} us/item   x{speedup:.2f}"
+    )
+    return speedup
+
+
+async def run(rounds: int, per_page: int):
+    courses = make_courses(per_page)
+    reviews = make_reviews(per_page)
+    stream_rows = make_stream_rows(per_page)
+
+    def course_page():
+        items = [CourseRead.model_validate(c) for c in courses]
+        return listing_page(CourseRead, items, per_page, 1, per_page)
+
+    def review_page():
+        items = [ReviewRead.model_validate(r) for r in reviews]
+        return listing_page(ReviewRead, items, per_page, None, per_page)
+
+    def stream_page():
+        items = [construct_stream(r.leader_id, r.course_title, r.stream, r.participant_ids) for r in stream_rows]
+        return listing_page(StreamRead, items, per_page, 1, per_page)
+
+    print(f"{per_page}-item pages, {rounds} rounds")
+    await measure("courses", course_page, response_field("read_courses", course_page()), rounds, per_page)
+    await measure("reviews", review_page, response_field("read_reviews", review_page()), rounds, per_page)
+    await measure("streams", stream_page, response_field("read_streams", stream_page()), rounds, per_page)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=500)
+    parser.add_argument("--per-page", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(run(args.rounds, args.per_page))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import asyncio
+
+from sqlalchemy import select
+
+import app.courses_streams.models  # noqa: F401 registers the mappers referenced by Course
+from app.commons.database import get_engine
+from app.courses.models import Course
+from app.courses.ratings import backfill_ratings_statement
+
+
+BATCH_SIZE = 500
+
+
+async def backfill_ratings():
+    updated, last_id = 0, 0
+    while True:
+        async with get_engine().begin() as conn:
+            # Course rows first, in the order create_review takes them: a review that holds its course is
+            # committed before the recount reads it, a later one waits and is added on top of the recount
+            stmt = select(Course.id).where(Course.id > last_id).order_by(Course.id).limit(BATCH_SIZE).with_for_update()
+            course_ids = (await conn.scalars(stmt)).all()
+            if not course_ids:
+                break
+            updated += (await conn.execute(backfill_ratings_statement(course_ids))).rowcount
+        last_id = course_ids[-1]
+    await get_engine().dispose()
+    print(f"Rating aggregates recomputed for {updated} courses.")
+
+
+def main():
+    asyncio.run(backfill_ratings())
+
+
+if __name__ == "__main__":
+    main()
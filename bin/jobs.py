@@ -0,0 +1,58 @@
+import asyncio
+import logging
+import signal
+
+from app.commons.database import dispose_engines, get_session_maker
+from app.commons.settings import get_settings
+from app.jobs import handlers  # noqa: F401  registers the job handlers
+from app.jobs.outbox import due_job_ids, get_job_queue
+
+
+logger = logging.getLogger("app.jobs")
+
+
+async def drain(stopping: asyncio.Event):
+    """
+    Runs due outbox jobs until ``stopping`` is set: retries, jobs web workers did not take (queue full,
+    JOBS_IN_PROCESS off) and jobs whose process died holding the lease. Several of these may run at once.
+    """
+    settings = get_settings()
+    queue = get_job_queue()
+    queue.start()
+    while not stopping.is_set():
+        async with get_session_maker()() as db:
+            job_ids = await due_job_ids(db, limit=settings.JOBS_QUEUE_SIZE)
+        for job_id in job_ids:
+            queue.submit(job_id)
+        # The next batch once this one ran, or after the poll interval when there was nothing to do
+        waiting = [
+            asyncio.ensure_future(queue.join() if job_ids else asyncio.sleep(settings.JOBS_POLL_INTERVAL)),
+            asyncio.ensure_future(stopping.wait()),
+        ]
+        await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+        for task in waiting:
+            task.cancel()
+    await queue.stop(settings.JOBS_SHUTDOWN_TIMEOUT)
+
+
+async def run():
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stopping.set)
+    logger.info("Draining the outbox")
+    try:
+        await drain(stopping)
+    finally:
+        await dispose_engines()
+
+
+def main():
+    logging.basicConfig(
+        level=get_settings().LOG_LEVEL.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
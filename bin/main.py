@@ -1,8 +1,91 @@
+import logging
+import os
+import random
+import tempfile
+from pathlib import Path
+
 import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+from app.commons.settings import get_settings
+
+
+logger = logging.getLogger("uvicorn.error")
+
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+
+class WorkerConfig(uvicorn.Config):
+    """
+    Loaded by every worker on its own (spawned workers get a pickled copy), which spreads the recycling
+    limits: workers that all reached ``limit_max_requests`` together would all restart together.
+    """
+
+    def __init__(self, *args, max_requests_jitter: int = 0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_requests_jitter = max_requests_jitter
+
+    def load(self):
+        if self.limit_max_requests and self.max_requests_jitter:
+            self.limit_max_requests += random.randint(0, self.max_requests_jitter)
+        super().load()
+
+
+def available_cpus() -> int:
+    # The CPUs this process may run on, which is what a container's cpuset limits
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+
+def reset_multiprocess_dir():
+    """
+    Drops metric files left by a previous run before any worker writes new ones. Must not import the app:
+    prometheus_client creates the files of a process as soon as the metrics are defined.
+    """
+    path = os.environ.get(MULTIPROC_DIR_ENV)
+    if not path:
+        return
+    Path(path).mkdir(parents=True, exist_ok=True)
+    for metric_file in Path(path).glob("*.db"):
+        metric_file.unlink()
 
 
 def serve():
-    uvicorn.run("app.main:app", host="0.0.0.0", log_level="info")
+    """
+    Runs WEB_CONCURRENCY workers (all CPUs by default) behind one listening socket. The app is imported
+    by the workers only: each builds its own engine and pool on first use and disposes them on shutdown.
+
+    SIGTERM stops accepting connections and lets in-flight requests finish for up to SHUTDOWN_TIMEOUT
+    seconds. SIGHUP restarts the workers one by one, SIGTTIN/SIGTTOU add or remove one.
+    """
+    settings = get_settings()
+    workers = settings.WEB_CONCURRENCY or available_cpus()
+    if workers > 1:
+        # Every worker writes its metrics there and /metrics on any of them reports the sum
+        os.environ.setdefault(MULTIPROC_DIR_ENV, str(Path(tempfile.gettempdir()) / "crossdo-prometheus"))
+    reset_multiprocess_dir()
+
+    config = WorkerConfig(
+        "app.main:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        workers=workers,
+        loop=settings.SERVER_LOOP,
+        http=settings.SERVER_HTTP,
+        log_level=settings.LOG_LEVEL.lower(),
+        proxy_headers=True,
+        forwarded_allow_ips=settings.FORWARDED_ALLOW_IPS,
+        timeout_keep_alive=settings.KEEP_ALIVE_TIMEOUT,
+        timeout_graceful_shutdown=settings.SHUTDOWN_TIMEOUT,
+        limit_max_requests=settings.WORKER_MAX_REQUESTS,
+        max_requests_jitter=settings.WORKER_MAX_REQUESTS_JITTER,
+    )
+    logger.info(f"Starting {workers} worker(s), loop={settings.SERVER_LOOP}, http={settings.SERVER_HTTP}")
+    server = uvicorn.Server(config)
+    if workers > 1:
+        # What uvicorn.run does for --workers, with our config class
+        Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
+    else:
+        server.run()
 
 
 if __name__ == "__main__":
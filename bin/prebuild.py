@@ -0,0 +1,14 @@
+from app.commons.prebuild import write_openapi, write_schema_heads
+from app.commons.settings import get_settings
+
+
+def main():
+    from app.main import app
+
+    write_openapi(app)
+    write_schema_heads()
+    print(f"Build artifacts written to {get_settings().BUILD_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Where a fresh worker spends its time before it can serve: import time of ``app.main`` broken down by
+package and by module (from ``python -X importtime``), then the lifespan startup.
+
+    poetry run profile-startup [--top 20]
+"""
+
+import argparse
+import asyncio
+import re
+import subprocess
+import sys
+import time
+from collections import Counter
+
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def import_times(module: str) -> list[tuple[str, int, int]]:
+    """(module, self us, cumulative us) for every module a fresh interpreter imports along with ``module``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            rows.append((match[4], int(match[1]), int(match[2])))
+    return rows
+
+
+async def lifespan_seconds() -> float:
+    from app.main import app, lifespan
+
+    started = time.perf_counter()
+    async with lifespan(app):
+        elapsed = time.perf_counter() - started
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--skip-lifespan", action="store_true", help="Do not connect to the database")
+    args = parser.parse_args()
+
+    rows = import_times(args.module)
+    packages = Counter()
+    for name, self_us, _ in rows:
+        packages[name.partition(".")[0]] += self_us
+    total = sum(packages.values())
+
+    print(f"import {args.module}: {total / 1000:.0f} ms, {len(rows)} modules\n")
+    print(f"{'package':<32} {'self ms':>8} {'share':>6}")
+    for package, self_us in packages.most_common(args.top):
+        print(f"{package:<32} {self_us / 1000:>8.1f} {self_us / total:>6.1%}")
+
+    print(f"\n{'module':<48} {'cumulative ms':>14}")
+    for name, _, cumulative_us in sorted(rows, key=lambda row: -row[2])[: args.top]:
+        print(f"{name:<48} {cumulative_us / 1000:>14.1f}")
+
+    if not args.skip_lifespan:
+        print(f"\nlifespan startup: {asyncio.run(lifespan_seconds()) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
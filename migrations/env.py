@@ -0,0 +1,62 @@
+import asyncio
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import pool
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import app.courses.models  # noqa: F401
+import app.courses_streams.models  # noqa: F401
+import app.jobs.models  # noqa: F401
+import app.users.models  # noqa: F401
+from app.commons.database import Base, database_url
+
+
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def include_name(name, type_, parent_names) -> bool:
+    # FTS5 table (and its shadow tables) behind SQLite course search, created by revision 0004
+    return not (type_ == "table" and name.startswith("courses_fts"))
+
+
+def configure(**kwargs) -> None:
+    context.configure(
+        target_metadata=target_metadata,
+        include_name=include_name,
+        # SQLite can only alter columns and constraints by copying the table
+        render_as_batch=database_url.get_backend_name() == "sqlite",
+        compare_server_default=True,
+        **kwargs,
+    )
+
+
+def run_migrations_offline() -> None:
+    configure(url=database_url, literal_binds=True, dialect_opts={"paramstyle": "named"})
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection: Connection) -> None:
+    configure(connection=connection)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_async_migrations() -> None:
+    connectable = create_async_engine(database_url, poolclass=pool.NullPool)
+    async with connectable.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    await connectable.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    asyncio.run(run_async_migrations())
@@ -0,0 +1,43 @@
+"""course rating aggregates
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 22:21:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+RATING_COLUMNS = ["rating_sum", "rating_count", *(f"rating_{stars}_count" for stars in range(1, 6))]
+
+
+def upgrade() -> None:
+    for name in RATING_COLUMNS:
+        op.add_column("courses", sa.Column(name, sa.Integer(), server_default="0", nullable=False))
+
+    courses = sa.table("courses", sa.column("id"), *(sa.column(name) for name in RATING_COLUMNS))
+    reviews = sa.table("reviews", sa.column("course_id"), sa.column("rating"))
+
+    def reviews_of_course(column, *criteria):
+        return sa.select(column).where(reviews.c.course_id == courses.c.id, *criteria).scalar_subquery()
+
+    values = {
+        "rating_sum": sa.func.coalesce(reviews_of_course(sa.func.sum(reviews.c.rating)), 0),
+        "rating_count": reviews_of_course(sa.func.count()),
+    }
+    for stars in range(1, 6):
+        values[f"rating_{stars}_count"] = reviews_of_course(sa.func.count(), reviews.c.rating == stars)
+    op.execute(courses.update().values(values))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("courses") as batch_op:
+        for name in reversed(RATING_COLUMNS):
+            batch_op.drop_column(name)
@@ -0,0 +1,52 @@
+"""stream seats_taken and one participation per user and stream
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 22:22:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+UNIQUE_PARTICIPANT = "uq_participants_stream_id_user_id"
+
+
+def upgrade() -> None:
+    op.add_column("course_streams", sa.Column("seats_taken", sa.Integer(), server_default="0", nullable=False))
+
+    # Racing joins could insert the same participant twice, keep the first row of each pair
+    op.execute(
+        "DELETE FROM participants WHERE id NOT IN " "(SELECT min(id) FROM participants GROUP BY stream_id, user_id)"
+    )
+    op.execute(
+        "UPDATE course_streams SET seats_taken = "
+        "(SELECT count(*) FROM participants WHERE participants.stream_id = course_streams.id)"
+    )
+
+    if op.get_bind().dialect.name == "postgresql":
+        # Build the index without blocking joins, then attach it as the constraint
+        with op.get_context().autocommit_block():
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {UNIQUE_PARTICIPANT}")
+            op.create_index(
+                UNIQUE_PARTICIPANT, "participants", ["stream_id", "user_id"], unique=True, postgresql_concurrently=True
+            )
+        op.execute(
+            f"ALTER TABLE participants ADD CONSTRAINT {UNIQUE_PARTICIPANT} UNIQUE USING INDEX {UNIQUE_PARTICIPANT}"
+        )
+    else:
+        with op.batch_alter_table("participants") as batch_op:
+            batch_op.create_unique_constraint(UNIQUE_PARTICIPANT, ["stream_id", "user_id"])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("participants") as batch_op:
+        batch_op.drop_constraint(UNIQUE_PARTICIPANT, type_="unique")
+    with op.batch_alter_table("course_streams") as batch_op:
+        batch_op.drop_column("seats_taken")
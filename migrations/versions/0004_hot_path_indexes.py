@@ -0,0 +1,86 @@
+"""indexes for listing, filtering and searching
+
+On PostgreSQL every index is built with CREATE INDEX CONCURRENTLY, outside of a transaction, so the
+tables stay writable while they build. A failed concurrent build leaves an invalid index behind:
+drop it and run the upgrade again.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 22:23:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_courses_created_at_id", "courses", [sa.text("created_at DESC"), sa.text("id DESC")]),
+    ("ix_course_streams_created_at_id", "course_streams", [sa.text("created_at DESC"), sa.text("id DESC")]),
+    ("ix_course_streams_course_id", "course_streams", ["course_id"]),
+    ("ix_course_streams_created_by", "course_streams", ["created_by"]),
+    ("ix_reviews_course_id_created_at_id", "reviews", ["course_id", sa.text("created_at DESC"), sa.text("id DESC")]),
+]
+
+SEARCH_DOCUMENT = sa.text(
+    "(setweight(to_tsvector('simple'::regconfig, title), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, description), 'B'))"
+)
+
+SQLITE_SEARCH = [
+    "CREATE VIRTUAL TABLE courses_fts USING fts5(title, description, content='courses', content_rowid='id')",
+    """CREATE TRIGGER courses_fts_ai AFTER INSERT ON courses BEGIN
+    INSERT INTO courses_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+END""",
+    """CREATE TRIGGER courses_fts_ad AFTER DELETE ON courses BEGIN
+    INSERT INTO courses_fts(courses_fts, rowid, title, description)
+    VALUES ('delete', old.id, old.title, old.description);
+END""",
+    """CREATE TRIGGER courses_fts_au AFTER UPDATE OF title, description ON courses BEGIN
+    INSERT INTO courses_fts(courses_fts, rowid, title, description)
+    VALUES ('delete', old.id, old.title, old.description);
+    INSERT INTO courses_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+END""",
+    "INSERT INTO courses_fts(courses_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns)
+        for statement in SQLITE_SEARCH:
+            op.execute(statement)
+        return
+
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index(
+            "ix_courses_search_document",
+            "courses",
+            [SEARCH_DOCUMENT],
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        op.execute("DROP TABLE IF EXISTS courses_fts")
+        for trigger in ("courses_fts_ai", "courses_fts_ad", "courses_fts_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table)
+        return
+
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_courses_search_document", table_name="courses", postgresql_concurrently=True)
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
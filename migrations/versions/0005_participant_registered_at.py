@@ -0,0 +1,29 @@
+"""participants registered_at, for incremental exports
+
+Existing participants get the time of the upgrade.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 22:40:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # SQLite cannot ADD COLUMN with a non-constant default, batch mode rebuilds the table there
+    with op.batch_alter_table("participants") as batch_op:
+        batch_op.add_column(sa.Column("registered_at", sa.DateTime(timezone=True), server_default=sa.func.now()))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("participants") as batch_op:
+        batch_op.drop_column("registered_at")
@@ -0,0 +1,72 @@
+"""indexes for the GET /streams/ filters
+
+The course_id and created_by indexes are replaced by composite ones that also keep the newest-first
+order. On PostgreSQL every index is built and dropped CONCURRENTLY, outside of a transaction.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 22:50:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+NEWEST_FIRST = [sa.text("created_at DESC"), sa.text("id DESC")]
+
+# name, columns, partial index predicate
+INDEXES = [
+    ("ix_course_streams_course_id_created_at_id", ["course_id", *NEWEST_FIRST], None),
+    ("ix_course_streams_created_by_created_at_id", ["created_by", *NEWEST_FIRST], None),
+    ("ix_course_streams_not_started_created_at_id", NEWEST_FIRST, sa.text("has_started = false")),
+    ("ix_course_streams_duration_weeks_total_cost", ["duration_weeks", "total_cost"], None),
+    ("ix_course_streams_total_cost", ["total_cost"], None),
+]
+
+REPLACED = [
+    ("ix_course_streams_course_id", ["course_id"]),
+    ("ix_course_streams_created_by", ["created_by"]),
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        for name, columns, where in INDEXES:
+            op.create_index(name, "course_streams", columns, sqlite_where=where)
+        for name, _ in REPLACED:
+            op.drop_index(name, table_name="course_streams")
+        return
+
+    with op.get_context().autocommit_block():
+        for name, columns, where in INDEXES:
+            op.create_index(
+                name,
+                "course_streams",
+                columns,
+                postgresql_where=where,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+        for name, _ in REPLACED:
+            op.drop_index(name, table_name="course_streams", postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        for name, columns in REPLACED:
+            op.create_index(name, "course_streams", columns)
+        for name, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name="course_streams")
+        return
+
+    with op.get_context().autocommit_block():
+        for name, columns in REPLACED:
+            op.create_index(name, "course_streams", columns, postgresql_concurrently=True, if_not_exists=True)
+        for name, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name="course_streams", postgresql_concurrently=True, if_exists=True)